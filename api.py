@@ -0,0 +1,265 @@
+import hashlib
+import hmac
+import json
+from functools import wraps
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from sqlalchemy import select
+from autocomplete import autocomplete
+from cache import cache
+from models import db, Venue, Artist, Show
+from booking import book_shows, parse_bookings
+from facets import parse_filters
+from exporter import EXPORTS, LINE_WRITERS, export_rows, json_default, parse_since
+from importer import IMPORTERS, import_rows, read_request_rows
+from queries import venue_detail, artist_detail
+from search import search, search_page
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+# /api/v1 mirrors the HTML views. Detail endpoints return the same dicts the
+# pages render (and share their cache entries); collections are streamed
+# from a server-side cursor as a chunked JSON array, or as NDJSON with
+# ?format=ndjson or Accept: application/x-ndjson. Every response carries an
+# ETag, and If-None-Match answers 304 without touching the rows. A streamed
+# body closes its cursor and removes the session when it ends, or when the
+# client goes away, so the connection goes back to the pool right then.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+VENUE_COLUMNS = (
+    Venue.id, Venue.name, Venue.genres, Venue.address, Venue.city, Venue.state,
+    Venue.phone, Venue.website_link.label('website'), Venue.facebook_link,
+    Venue.seeking_talent, Venue.seeking_description, Venue.image_link,
+    Venue.upcoming_shows_count, Venue.past_shows_count,
+)
+
+ARTIST_COLUMNS = (
+    Artist.id, Artist.name, Artist.genres, Artist.city, Artist.state,
+    Artist.phone, Artist.website_link.label('website'), Artist.facebook_link,
+    Artist.seeking_venue, Artist.seeking_description, Artist.image_link,
+    Artist.upcoming_shows_count, Artist.past_shows_count,
+)
+
+SHOW_COLUMNS = (
+    Show.id, Show.start_time,
+    Venue.id.label('venue_id'), Venue.name.label('venue_name'), Venue.image_link.label('venue_image_link'),
+    Artist.id.label('artist_id'), Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link'),
+)
+
+
+def dumps(value):
+    return json.dumps(value, default=json_default, separators=(',', ':'))
+
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+
+def collection_etag(name, *aggregates):
+    # fingerprint of a collection from a handful of index-backed aggregates
+    row = db.session.execute(select(*[a.scalar_subquery() for a in aggregates])).one()
+    return hashlib.md5(repr((name,) + tuple(row)).encode()).hexdigest()
+
+
+def released(lines):
+    # a streamed body that hands its connection back once it is done
+    try:
+        yield from lines
+    finally:
+        lines.close()
+        db.session.remove()
+
+
+def stream_rows(statement):
+    result = db.session.execute(
+        statement.execution_options(yield_per=current_app.config['API_STREAM_BATCH_SIZE']))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def stream_collection(etag, statement):
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    ndjson = wants_ndjson()
+
+    def generate():
+        rows = stream_rows(statement)
+        if ndjson:
+            for row in rows:
+                yield dumps(row._asdict()) + '\n'
+            return
+        yield '['
+        separator = ''
+        for row in rows:
+            yield separator + dumps(row._asdict())
+            separator = ','
+        yield ']'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    response = Response(stream_with_context(released(generate())), mimetype=mimetype)
+    response.set_etag(etag)
+    return response
+
+
+def require_token(view):
+    # bulk endpoints take Authorization: Bearer <API_ADMIN_TOKEN>, and are
+    # disabled entirely while no token is configured
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('API_ADMIN_TOKEN')
+        supplied = request.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(supplied.encode(), ('Bearer ' + token).encode()):
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def conditional_json(data):
+    response = current_app.response_class(dumps(data), mimetype='application/json')
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api.route('/venues')
+def venues():
+    etag = collection_etag('venues', select(db.func.count(Venue.id)), select(db.func.max(Venue.updated_at)))
+    return stream_collection(etag, select(*VENUE_COLUMNS).order_by(Venue.id))
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    data = cache.data('venue:{}'.format(venue_id), lambda: venue_detail(venue_id))
+    if data is None:
+        abort(404)
+    return conditional_json(data)
+
+
+@api.route('/artists')
+def artists():
+    etag = collection_etag('artists', select(db.func.count(Artist.id)), select(db.func.max(Artist.updated_at)))
+    return stream_collection(etag, select(*ARTIST_COLUMNS).order_by(Artist.id))
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    data = cache.data('artist:{}'.format(artist_id), lambda: artist_detail(artist_id))
+    if data is None:
+        abort(404)
+    return conditional_json(data)
+
+
+@api.route('/shows')
+def shows():
+    # show rows embed venue and artist names, so their edits change the tag too
+    etag = collection_etag(
+        'shows', select(db.func.count(Show.id)), select(db.func.max(Show.updated_at)),
+        select(db.func.max(Venue.updated_at)), select(db.func.max(Artist.updated_at))
+    )
+    statement = select(*SHOW_COLUMNS)\
+        .join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .order_by(Show.start_time, Show.id)
+    return stream_collection(etag, statement)
+
+
+@api.route('/shows', methods=['POST'])
+@require_token
+def schedule_shows():
+    # books a tour: {"artist_id": 7, "shows": [{"venue_id": 3, "start_time":
+    # "2025-06-01T20:00"}, ...]}, all or nothing. 201 with the new show ids,
+    # or 409 with the problems of every show that cannot be booked.
+    try:
+        bookings = parse_bookings(request.get_json(silent=True), current_app.config.get('SHOW_BATCH_MAX', 500))
+    except ValueError:
+        abort(400)
+    try:
+        shows, problems = book_shows(bookings)
+        if problems:
+            db.session.rollback()
+            return jsonify({"errors": [{"index": n, "errors": problems[n]} for n in sorted(problems)]}), 409
+        ids = [show.id for show in shows]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    cache.evict('venues', *['venue:{}'.format(v) for v in sorted({v for v, _, _ in bookings})] +
+                ['artist:{}'.format(a) for a in sorted({a for _, a, _ in bookings})])
+    cache.evict_prefix('shows')
+    return jsonify({"shows": ids}), 201
+
+
+@api.route('/search/<any(venues, artists):kind>')
+def search_collection(kind):
+    model = Venue if kind == 'venues' else Artist
+    page, per_page = search_page()
+    filters = parse_filters(request.args)
+    rows, count, facets = search(model, request.args.get('q', ''), per_page, (page - 1) * per_page, filters)
+    return conditional_json({
+        "count": count,
+        "page": page,
+        "per_page": per_page,
+        "data": [row._asdict() for row in rows],
+        "facets": facets
+    })
+
+
+@api.route('/autocomplete/<any(venues, artists):kind>')
+def autocomplete_names(kind):
+    # ?q=<prefix>; answered from the in-process index, not the database
+    limit = request.args.get('limit', current_app.config.get('AUTOCOMPLETE_LIMIT', 10), type=int)
+    limit = min(max(limit, 1), current_app.config.get('AUTOCOMPLETE_MAX_LIMIT', 50))
+    return jsonify({"data": autocomplete.suggest(kind, request.args.get('q', ''), limit)})
+
+
+@api.route('/import/<kind>', methods=['POST'])
+@require_token
+def import_collection(kind):
+    # body is CSV (Content-Type: text/csv) or NDJSON, read as it arrives
+    if kind not in IMPORTERS:
+        abort(404)
+    batch_size = request.args.get('batch_size', 1000, type=int)
+    result = import_rows(kind, read_request_rows(request), max(batch_size, 1))
+    return jsonify(result.as_dict()), 200 if not result.errors else 207
+
+
+@api.route('/export/<kind>')
+@require_token
+def export_collection(kind):
+    # ?format=ndjson|csv&since=<ISO 8601>; parquet is only offered by the CLI
+    if kind not in EXPORTS:
+        abort(404)
+    format = request.args.get('format', 'ndjson')
+    if format not in LINE_WRITERS:
+        abort(400)
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        abort(400)
+    rows = export_rows(kind, since, current_app.config['API_STREAM_BATCH_SIZE'])
+    mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(released(LINE_WRITERS[format](kind, rows))), mimetype=mimetype)
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": "bad request"}), 400
+
+
+@api.errorhandler(401)
+def unauthorized(error):
+    return jsonify({"error": "unauthorized"}), 401
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({"error": "not found"}), 404
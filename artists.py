@@ -0,0 +1,161 @@
+import re
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+from models import db, Artist
+from search import search, search_page
+from routing import read_only
+from cache import cache
+from feed import refresh_feed
+from queries import artist_listing, artist_detail
+from facets import parse_filters, filtered
+from pages import artist_cache_names, evict_pages, listing_page_name
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+# The artist pages, forms and writes; form classes are imported in the views,
+# as in venues.py.
+
+blueprint = Blueprint('artists', __name__)
+
+@blueprint.route('/artists')
+@cache.cached_page(listing_page_name('artists'))
+def artists():
+  # ?genre=&city=&state=&upcoming=1 narrow the list; see facets.py
+  filters = parse_filters(request.args)
+  if filtered(filters):
+    listing = artist_listing(filters)
+  else:
+    listing = cache.data('artists', artist_listing)
+  return render_template('pages/artists.html', filters=filters, **listing)
+
+@blueprint.route('/artists/search', methods=['POST'])
+@read_only
+def search_artists():
+  # ranked, indexed search over artist name, city, state and genres.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term = request.form.get('search_term', '')
+  page, per_page = search_page()
+  filters = parse_filters(request.args)
+  artists, count, facets = search(Artist, search_term, per_page, (page - 1) * per_page, filters)
+
+  response = {}
+  response['count'] = count
+  response['data'] = [artist._asdict() for artist in artists]
+  response['page'] = page
+  response['pages'] = -(-count // per_page)
+  response['per_page'] = per_page
+  return render_template('pages/search_artists.html', results=response, search_term=search_term,
+                         filters=filters, facets=facets)
+
+@blueprint.route('/artists/<int:artist_id>')
+@cache.cached_page(lambda artist_id: 'artist:{}'.format(artist_id))
+def show_artist(artist_id):
+  data = cache.data('artist:{}'.format(artist_id), lambda: artist_detail(artist_id))
+  if data is None:
+    abort(404)
+  return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  artist = Artist.query.get(artist_id)
+  if not artist:
+      return redirect(url_for('index'))
+  form = ArtistForm(obj=artist)
+  artist = {"id": artist_id, "name": artist.name, "genres": artist.genres, "city": artist.city, "state": artist.state, "phone": artist.phone, "website": artist.website_link, "facebook_link": artist.facebook_link, "seeking_venue": artist.seeking_venue, "seeking_description": artist.seeking_description, "image_link": artist.image_link}
+  # TODO: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  from forms import ArtistForm
+  error = False
+  form = ArtistForm(request.form)
+  if request.method == "POST" and form.validate():
+    try:
+      edit_artist = Artist.query.get(artist_id)
+      edit_artist.name = form.name.data
+      edit_artist.city = form.city.data
+      edit_artist.state = form.state.data
+      edit_artist.phone = form.phone.data
+      edit_artist.genres = form.genres.data
+      edit_artist.seeking_venue = form.seeking_venue.data
+      edit_artist.seeking_description = form.seeking_description.data
+      edit_artist.image_link = form.image_link.data
+      edit_artist.website_link = form.website_link.data
+      edit_artist.facebook_link = form.facebook_link.data
+      # the feed carries the artist's name and image on each of its shows
+      refresh_feed.delay(artist_ids=[artist_id])
+      db.session.commit()
+    except Exception:
+      error = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if not error:
+      # on successful db insert, flash success
+      evict_pages(*artist_cache_names(artist_id))
+      flash('Artist ' + request.form['name'] + ' was successfully edited!')
+    else:
+      flash('An error occurred. Artist ' + form.name.data + ' could not be edited.')
+  else:
+    flash(form.errors)
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  from forms import ArtistForm
+  error = False
+  form = ArtistForm(request.form)
+  if request.method == "POST" and form.validate():
+    try:
+      artists = Artist(
+        name = form.name.data,
+        city = form.city.data,
+        state = form.state.data,
+        phone = re.sub('\D', '', form.phone.data),
+        image_link = form.image_link.data,
+        genres = form.genres.data,
+        facebook_link = form.facebook_link.data,
+        website_link = form.website_link.data,
+        seeking_venue = form.seeking_venue.data,
+        seeking_description = form.seeking_description.data
+      )
+      db.session.add(artists)
+      db.session.commit()
+    except Exception:
+      error = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if not error:
+      # on successful db insert, flash success
+      cache.evict('artists')
+      flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    else:
+      flash(f'An error occurred. Artist {form.name.data} could not be listed.')
+  else:
+    flash(form.errors)
+  # TODO: modify data to be the data object returned from db insertion
+
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+  return render_template('pages/home.html')
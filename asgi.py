@@ -0,0 +1,380 @@
+"""ASGI entry point: async reads for the busy pages, the Flask app for the rest.
+
+    uvicorn asgi:application --workers 4
+
+The venues, artists and shows listings, the venue and artist pages and both
+searches are served by the coroutine views below, which query through async
+SQLAlchemy engines (asyncpg on Postgres, aiosqlite on SQLite) and render the
+same templates with the same page/data cache entries as the WSGI views. The
+detail pages run their three independent queries (the row, its upcoming
+shows, its past shows) concurrently on separate connections. Every other
+request, including all writes, is handed to the WSGI app unchanged.
+
+A replica read that fails to connect marks the replica down, as the sync
+router does, and is retried on the primary. The redis cache backend does
+blocking network I/O, so its calls run in a thread (cache.run()).
+
+Needs asgiref and greenlet, plus asyncpg or aiosqlite, on top of the
+WSGI requirements.
+"""
+import asyncio
+import io
+import logging
+import sys
+import time
+from datetime import datetime
+from asgiref.wsgi import WsgiToAsgi
+from flask import abort, render_template, request, session
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.exceptions import HTTPException
+from app import create_app
+from cache import cache
+from facets import facet_statement, facets_from_rows, filtered, parse_filters
+from models import Venue, Artist
+from pages import listing_page_name
+from queries import (
+    venue_areas_statement, venue_areas_from_rows, venue_shows_statement, venue_data, artist_show,
+    artist_list_statement, artist_list_from_rows, artist_shows_statement, artist_data, venue_show,
+    show_page_statement, show_page_from_rows
+)
+from routing import REPLICA_BIND, replicas
+from search import search_page, search_statements
+from shows import show_page_name, show_range, show_range_args
+
+app = create_app()
+
+logger = logging.getLogger('fyyur.routing')
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def async_engine_options(options):
+    options = dict(options)
+    connect_args = dict(options.pop('connect_args', {}))
+    # asyncpg takes server settings directly, not a libpq "-c name=value" string
+    setting = connect_args.pop('options', None)
+    if setting:
+        name, value = setting.replace('-c ', '', 1).split('=', 1)
+        connect_args['server_settings'] = {name: value}
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class Engines(object):
+    # async twins of the app's primary and replica engines, made on first use.
+    # Reads follow the sync router's rules: the client's sticky-primary window
+    # first, then round-robin over replicas the sync side has not marked down.
+
+    def __init__(self):
+        self.primary = None
+        self.replicas = {}
+
+    def setup(self):
+        options = async_engine_options(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        self.primary = create_async_engine(async_url(app.config['SQLALCHEMY_DATABASE_URI']), **options)
+        self.replicas = {
+            key: create_async_engine(async_url(url), **options)
+            for key, url in app.config.get('SQLALCHEMY_BINDS', {}).items() if key.startswith(REPLICA_BIND)
+        }
+
+    def for_reads(self):
+        if self.primary is None:
+            self.setup()
+        if session.get('_primary_until', 0) > time.time():
+            return self.primary
+        for key in replicas.candidates(sorted(self.replicas)):
+            return self.replicas[key]
+        return self.primary
+
+    def replica_key(self, engine):
+        # the bind key of a replica engine, None for the primary
+        return next((key for key, replica in self.replicas.items() if replica is engine), None)
+
+    async def dispose(self):
+        for engine in [self.primary] + list(self.replicas.values()):
+            if engine is not None:
+                await engine.dispose()
+
+
+engines = Engines()
+
+
+async def fetch(engine, statement):
+    try:
+        async with engine.connect() as connection:
+            return (await connection.execute(statement)).all()
+    except OperationalError as e:
+        key = engines.replica_key(engine)
+        if key is None:
+            raise
+        replicas.mark_down(key, app.config.get('REPLICA_RETRY_SECONDS', 30))
+        logger.warning('Replica %s unavailable, reading from the primary: %s', key, e)
+        return await fetch(engines.primary, statement)
+
+
+async def cached_data(name, compute):
+    # cache.data() for a coroutine; shares the 'data:<name>' entries with the WSGI views
+    value = await cache.run(cache.get, 'data:' + name)
+    if value is None:
+        value = await compute()
+        await cache.run(cache.set, 'data:' + name, value)
+    return value
+
+
+#----------------------------------------------------------------------------#
+# Data.
+#----------------------------------------------------------------------------#
+
+async def venue_detail(engine, venue_id):
+    now = datetime.now()
+    venue, upcoming, past = await asyncio.gather(
+        fetch(engine, select(Venue.__table__).where(Venue.id == venue_id)),
+        fetch(engine, venue_shows_statement(venue_id, True, now)),
+        fetch(engine, venue_shows_statement(venue_id, False, now)),
+    )
+    if not venue:
+        return None
+    return venue_data(venue[0], [artist_show(*row) for row in past], [artist_show(*row) for row in upcoming])
+
+
+async def artist_detail(engine, artist_id):
+    now = datetime.now()
+    artist, upcoming, past = await asyncio.gather(
+        fetch(engine, select(Artist.__table__).where(Artist.id == artist_id)),
+        fetch(engine, artist_shows_statement(artist_id, True, now)),
+        fetch(engine, artist_shows_statement(artist_id, False, now)),
+    )
+    if not artist:
+        return None
+    return artist_data(artist[0], [venue_show(*row) for row in past], [venue_show(*row) for row in upcoming])
+
+
+async def listing(engine, model, statement, from_rows, filters):
+    # rows and facet counts for /venues or /artists, fetched concurrently
+    rows, facets = await asyncio.gather(
+        fetch(engine, statement(filters, engine.dialect.name)),
+        fetch(engine, facet_statement(model, filters, engine.dialect.name)),
+    )
+    return from_rows(rows), facets_from_rows(facets)
+
+
+async def search_results(engine, model):
+    search_term = request.form.get('search_term', '')
+    page, per_page = search_page()
+    filters = parse_filters(request.args)
+    statements = search_statements(model, search_term, per_page, (page - 1) * per_page, engine.dialect.name, filters)
+    rows, count, facets = await asyncio.gather(*[fetch(engine, statement) for statement in statements])
+    count = count[0][0]
+    results = {
+        "count": count,
+        "data": [row._asdict() for row in rows],
+        "page": page,
+        "pages": -(-count // per_page),
+        "per_page": per_page,
+    }
+    return results, search_term, filters, facets_from_rows(facets)
+
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+
+@cache.cached_page(listing_page_name('venues'))
+async def venues():
+    engine = engines.for_reads()
+    filters = parse_filters(request.args)
+
+    async def compute():
+        areas, facets = await listing(engine, Venue, venue_areas_statement, venue_areas_from_rows, filters)
+        return {"areas": areas, "facets": facets}
+    data = await compute() if filtered(filters) else await cached_data('venues', compute)
+    return render_template('pages/venues.html', filters=filters, **data)
+
+
+async def search_venues():
+    results, search_term, filters, facets = await search_results(engines.for_reads(), Venue)
+    return render_template('pages/search_venues.html', results=results, search_term=search_term,
+                           filters=filters, facets=facets)
+
+
+@cache.cached_page(lambda venue_id: 'venue:{}'.format(venue_id))
+async def show_venue(venue_id):
+    engine = engines.for_reads()
+    data = await cached_data('venue:{}'.format(venue_id), lambda: venue_detail(engine, venue_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@cache.cached_page(listing_page_name('artists'))
+async def artists():
+    engine = engines.for_reads()
+    filters = parse_filters(request.args)
+
+    async def compute():
+        artists, facets = await listing(engine, Artist, artist_list_statement, artist_list_from_rows, filters)
+        return {"artists": artists, "facets": facets}
+    data = await compute() if filtered(filters) else await cached_data('artists', compute)
+    return render_template('pages/artists.html', filters=filters, **data)
+
+
+async def search_artists():
+    results, search_term, filters, facets = await search_results(engines.for_reads(), Artist)
+    return render_template('pages/search_artists.html', results=results, search_term=search_term,
+                           filters=filters, facets=facets)
+
+
+@cache.cached_page(lambda artist_id: 'artist:{}'.format(artist_id))
+async def show_artist(artist_id):
+    engine = engines.for_reads()
+    data = await cached_data('artist:{}'.format(artist_id), lambda: artist_detail(engine, artist_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@cache.cached_page(show_page_name)
+async def shows():
+    engine = engines.for_reads()
+    after, before = request.args.get('after'), request.args.get('before')
+    start, end, city = show_range()
+    per_page = app.config['SHOWS_PER_PAGE']
+
+    async def compute():
+        rows = await fetch(engine, show_page_statement(after, before, per_page, start, end, city))
+        return show_page_from_rows(rows, after, before, per_page)
+    page = await cached_data(show_page_name(), compute)
+    return render_template('pages/shows.html', range_args=show_range_args(), **page)
+
+
+# blueprint endpoint -> coroutine view that replaces it under ASGI
+ASYNC_VIEWS = {
+    'venues.venues': venues,
+    'venues.search_venues': search_venues,
+    'venues.show_venue': show_venue,
+    'artists.artists': artists,
+    'artists.search_artists': search_artists,
+    'artists.show_artist': show_artist,
+    'shows.shows': shows,
+}
+
+
+#----------------------------------------------------------------------------#
+# ASGI.
+#----------------------------------------------------------------------------#
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    if body:
+        # the whole body is already buffered, chunked or not
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+def async_view(environ):
+    # (coroutine view, view args) when the app's url map routes the request
+    # to a view served here, else (None, None)
+    try:
+        endpoint, view_args = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None, None
+    return ASYNC_VIEWS.get(endpoint), view_args
+
+
+async def read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+
+async def respond(environ, view, view_args):
+    # the same request handling Flask does for a view, around a coroutine
+    with app.request_context(environ):
+        try:
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = await view(**view_args)
+        except HTTPException as e:
+            rv = app.handle_user_exception(e)
+        except Exception as e:
+            rv = app.handle_exception(e)
+        return app.finalize_request(rv)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engines.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+wsgi_application = WsgiToAsgi(app)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    view, view_args = async_view(wsgi_environ(scope, b''))
+    if view is None:
+        return await wsgi_application(scope, receive, send)
+
+    environ = wsgi_environ(scope, await read_body(receive))
+    response = await respond(environ, view, view_args)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()],
+        })
+        body = b'' if scope['method'] == 'HEAD' else response.get_data()
+        await send({'type': 'http.response.body', 'body': body})
+    finally:
+        # as a WSGI server would: runs the call_on_close callbacks, such as
+        # the instrumentation's slow request report
+        response.close()
@@ -0,0 +1,175 @@
+import bisect
+import heapq
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Autocomplete.
+#----------------------------------------------------------------------------#
+
+# Typeahead suggestions for venue and artist names come from a per-process
+# prefix index instead of the database. Names are normalized (case-folded,
+# accents stripped, whitespace collapsed) and every word start is a key, so
+# "blue" finds "The Blue Note". The keys live in a sorted list searched with
+# bisect; matches are ranked by upcoming show count.
+#
+# An index is built from its table on first use and rebuilt after
+# AUTOCOMPLETE_REFRESH_SECONDS, which picks up writes made by other workers.
+# This worker's own writes are applied as they commit: new, edited and
+# deleted venues and artists, and new shows for the counts.
+
+MODELS = {'venues': Venue, 'artists': Artist}
+KINDS = {Venue: 'venues', Artist: 'artists'}
+
+# cached answers kept per index
+MAX_RESULTS = 4096
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').casefold())
+    return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def word_keys(name):
+    # the normalized name from each word onwards
+    normalized = normalize(name)
+    return [normalized[i:] for i in range(len(normalized)) if i == 0 or normalized[i - 1] == ' ']
+
+
+class PrefixIndex(object):
+
+    def __init__(self, rows=()):
+        self._entries = {}  # id -> [name, upcoming shows]
+        self._keys = []  # sorted (key, id)
+        # answers by (prefix, limit); short prefixes match much of the index,
+        # and writes are rare next to lookups
+        self._results = {}
+        self._lock = threading.Lock()
+        for row_id, name, upcoming in rows:
+            self._entries[row_id] = [name, upcoming or 0]
+            self._keys += [(key, row_id) for key in word_keys(name)]
+        self._keys.sort()
+
+    def add(self, row_id, name, upcoming):
+        with self._lock:
+            self._results.clear()
+            self._remove(row_id)
+            self._entries[row_id] = [name, upcoming or 0]
+            for key in word_keys(name):
+                bisect.insort(self._keys, (key, row_id))
+
+    def remove(self, row_id):
+        with self._lock:
+            self._results.clear()
+            self._remove(row_id)
+
+    def _remove(self, row_id):
+        entry = self._entries.pop(row_id, None)
+        if entry is None:
+            return
+        for key in word_keys(entry[0]):
+            i = bisect.bisect_left(self._keys, (key, row_id))
+            if i < len(self._keys) and self._keys[i] == (key, row_id):
+                del self._keys[i]
+
+    def bump(self, row_id, delta):
+        with self._lock:
+            entry = self._entries.get(row_id)
+            if entry is not None:
+                self._results.clear()
+                entry[1] = max(entry[1] + delta, 0)
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            found = self._results.get((prefix, limit))
+            if found is None:
+                start = bisect.bisect_left(self._keys, (prefix,))
+                end = bisect.bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+                ids = {row_id for _, row_id in self._keys[start:end]}
+                best = heapq.nsmallest(limit, ids, key=lambda i: (-self._entries[i][1], self._entries[i][0], i))
+                found = [{"id": i, "name": self._entries[i][0], "upcoming_shows_count": self._entries[i][1]}
+                         for i in best]
+                if len(self._results) >= MAX_RESULTS:
+                    self._results.clear()
+                self._results[(prefix, limit)] = found
+            return found
+
+
+class Autocomplete(object):
+
+    def __init__(self, app=None):
+        self.refresh_seconds = 300
+        self._indexes = {}  # kind -> (PrefixIndex, built at)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh_seconds = app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 300)
+        # indexes built from another app's database do not carry over
+        self._indexes = {}
+        app.extensions['autocomplete'] = self
+
+    def index(self, kind):
+        current = self._indexes.get(kind)
+        if current is not None and time.monotonic() - current[1] < self.refresh_seconds:
+            return current[0]
+        with self._lock:
+            current = self._indexes.get(kind)
+            if current is None or time.monotonic() - current[1] >= self.refresh_seconds:
+                model = MODELS[kind]
+                rows = db.session.query(model.id, model.name, model.upcoming_shows_count)
+                current = (PrefixIndex(rows), time.monotonic())
+                self._indexes[kind] = current
+            return current[0]
+
+    def suggest(self, kind, prefix, limit=10):
+        """Up to limit venues or artists whose name has a word starting with prefix."""
+        return self.index(kind).search(prefix, limit)
+
+    def invalidate(self, kind):
+        self._indexes.pop(kind, None)
+
+    def apply(self, changes):
+        # only indexes already built; the others load current rows when used
+        for action, kind, row_id, *args in changes:
+            current = self._indexes.get(kind)
+            if current is not None:
+                getattr(current[0], action)(row_id, *args)
+
+
+autocomplete = Autocomplete()
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_changes(session, flush_context):
+    changes = session.info.setdefault('autocomplete', [])
+    for obj in session.new | session.dirty:
+        if isinstance(obj, (Venue, Artist)):
+            changes.append(('add', KINDS[type(obj)], obj.id, obj.name, obj.upcoming_shows_count))
+        elif isinstance(obj, Show) and obj in session.new and obj.start_time >= datetime.now():
+            changes.append(('bump', 'venues', obj.venue_id, 1))
+            changes.append(('bump', 'artists', obj.artist_id, 1))
+    for obj in session.deleted:
+        if isinstance(obj, (Venue, Artist)):
+            changes.append(('remove', KINDS[type(obj)], obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_changes(session):
+    changes = session.info.pop('autocomplete', None)
+    if changes:
+        autocomplete.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changes(session):
+    session.info.pop('autocomplete', None)
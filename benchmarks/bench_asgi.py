@@ -0,0 +1,144 @@
+"""Throughput of the read pages served over WSGI versus ASGI.
+
+    python benchmarks/seed.py
+    python benchmarks/bench_asgi.py --duration 20 --connections 32 --output asgi.json
+
+Starts each server in a subprocess on a local port (a threaded werkzeug
+server for WSGI, uvicorn with asgi.application for ASGI), then drives it for
+--duration seconds from --connections keep-alive clients requesting the
+pages asgi.py serves natively, with skewed ids and search terms. Reports
+requests per second and p50/p95/p99 per server as JSON. Unlike the other
+benchmarks this goes over real sockets, so the server is part of what is
+measured; run it against Postgres for numbers that mean anything.
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from common import Sampler, load_app, report, summarize
+
+# (name, method, path, form) for the pages asgi.py serves natively
+ROUTES = [
+    ('venues', 'GET', '/venues', None),
+    ('show_venue', 'GET', '/venues/{venue}', None),
+    ('search_venues', 'POST', '/venues/search', {'search_term': '{term}'}),
+    ('artists', 'GET', '/artists', None),
+    ('show_artist', 'GET', '/artists/{artist}', None),
+    ('search_artists', 'POST', '/artists/search', {'search_term': '{term}'}),
+    ('shows', 'GET', '/shows', None),
+]
+
+
+def serve(mode, database, cache, port):
+    app = load_app(database, cache)
+    if mode == 'wsgi':
+        from werkzeug.serving import run_simple
+        run_simple('127.0.0.1', port, app, threaded=True)
+    else:
+        import uvicorn
+        import asgi
+        uvicorn.run(asgi.application, host='127.0.0.1', port=port, log_level='warning')
+
+
+def start(mode, args, port):
+    command = [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+               '--cache', args.cache]
+    if args.database:
+        command += ['--database', args.database]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit('{} server exited with {}'.format(mode, server.returncode))
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit('{} server did not start listening on port {}'.format(mode, port))
+
+
+def drive(app, port, connections, duration, seed):
+    samples = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(number):
+        sampler = Sampler(app, seed + number)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        turn = number
+        while time.perf_counter() < stop:
+            name, method, path, form = ROUTES[turn % len(ROUTES)]
+            turn += 1
+            body, headers = None, {}
+            if form:
+                body = urlencode({key: sampler.fill(value) for key, value in form.items()})
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            started = time.perf_counter()
+            connection.request(method, sampler.fill(path), body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local.append((name, (time.perf_counter() - started) * 1000, response.status))
+        connection.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in sorted({sample[0] for sample in samples}):
+        results[name] = summarize([s[1] for s in samples if s[0] == name], [])
+    results['all'] = summarize([s[1] for s in samples], [])
+    results['all']['errors'] = sum(1 for s in samples if s[2] >= 500)
+    results['all']['requests_per_second'] = round(len(samples) / elapsed, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: $BENCH_DATABASE_URL or benchmarks/bench.db)')
+    parser.add_argument('--cache', default='null', choices=['null', 'lru'])
+    parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated: wsgi, asgi')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per server')
+    parser.add_argument('--connections', type=int, default=16, help='Concurrent keep-alive clients')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.database, args.cache, args.port)
+        return
+
+    app = load_app(args.database, args.cache)
+    results = {}
+    for mode in args.servers.split(','):
+        server = start(mode, args, args.port)
+        try:
+            # one pass over every route so lazy engine setup is not measured
+            drive(app, args.port, 1, 0.5, args.seed)
+            for name, result in drive(app, args.port, args.connections, args.duration, args.seed).items():
+                results['{}.{}'.format(mode, name)] = result
+        finally:
+            server.terminate()
+            server.wait()
+    raise SystemExit(report(results, args.output))
+
+
+if __name__ == '__main__':
+    main()
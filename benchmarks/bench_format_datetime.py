@@ -0,0 +1,45 @@
+"""Per-call cost of the `datetime` template filter.
+
+    python benchmarks/bench_format_datetime.py
+
+Compares the original filter (dateutil parse of a string, then a full babel
+format_datetime) with templating.format_datetime, for both string and datetime
+input, over a working set of show times similar to a /shows page.
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import babel.dates
+import dateutil.parser
+from templating import format_datetime
+
+FULL = "EEEE MMMM, d, y 'at' h:mma"
+
+
+def original_format_datetime(value):
+    return babel.dates.format_datetime(dateutil.parser.parse(value), FULL, locale='en')
+
+
+def main(number=20000):
+    start = datetime(2026, 1, 1, 20, 0)
+    times = [start + timedelta(days=i // 3, hours=i % 3) for i in range(300)]
+    strings = [str(t) for t in times]
+    assert [original_format_datetime(s) for s in strings] == [format_datetime(t, 'full') for t in times]
+
+    cases = [
+        ('original, str', lambda i: original_format_datetime(strings[i % 300])),
+        ('filter, str', lambda i: format_datetime(strings[i % 300], 'full')),
+        ('filter, datetime', lambda i: format_datetime(times[i % 300], 'full')),
+    ]
+    for name, fn in cases:
+        counter = iter(range(number))
+        seconds = timeit.timeit(lambda: fn(next(counter)), number=number)
+        print('{:<18} {:8.2f} us/call'.format(name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
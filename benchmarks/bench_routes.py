@@ -0,0 +1,84 @@
+"""Latency and query count for every read route.
+
+    python benchmarks/seed.py
+    python benchmarks/bench_routes.py --iterations 200 --output routes.json
+    python benchmarks/bench_routes.py --baseline routes.json   # exits 1 on regression
+
+Each route is warmed up, then requested --iterations times through the test
+client with ids drawn from the same skewed popularity the seed data uses.
+Results are p50/p95/p99 in milliseconds plus statements per request, as
+JSON. With --baseline, a route whose p95 grew by more than --tolerance or
+that runs more statements than before is reported as a regression.
+"""
+import argparse
+import time
+
+from common import QueryCounter, Sampler, load_app, report, summarize
+
+# (name, method, path, form); {venue}, {artist} and {term} are filled per request
+ROUTES = [
+    ('index', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('show_venue', 'GET', '/venues/{venue}', None),
+    ('search_venues', 'POST', '/venues/search', {'search_term': '{term}'}),
+    ('artists', 'GET', '/artists', None),
+    ('show_artist', 'GET', '/artists/{artist}', None),
+    ('search_artists', 'POST', '/artists/search', {'search_term': '{term}'}),
+    ('shows', 'GET', '/shows', None),
+    ('edit_venue', 'GET', '/venues/{venue}/edit', None),
+    ('edit_artist', 'GET', '/artists/{artist}/edit', None),
+    ('create_show_form', 'GET', '/shows/create', None),
+    ('api.venues', 'GET', '/api/v1/venues', None),
+    ('api.venue', 'GET', '/api/v1/venues/{venue}', None),
+    ('api.artists', 'GET', '/api/v1/artists', None),
+    ('api.shows', 'GET', '/api/v1/shows', None),
+    ('api.search_collection', 'GET', '/api/v1/search/artists?q={term}', None),
+]
+
+
+def request(client, sampler, method, path, form):
+    data = {key: sampler.fill(value) for key, value in form.items()} if form else None
+    response = client.open(sampler.fill(path), method=method, data=data)
+    response.get_data()
+    response.close()
+    if response.status_code >= 400:
+        raise SystemExit('{} {} answered {}'.format(method, path, response.status_code))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: $BENCH_DATABASE_URL or benchmarks/bench.db)')
+    parser.add_argument('--cache', default='null', choices=['null', 'lru'],
+                        help="CACHE_BACKEND; 'lru' measures cache hits")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--route', action='append', help='Only run these routes (repeatable)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    parser.add_argument('--baseline', help='Earlier --output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    app = load_app(args.database, args.cache)
+    sampler = Sampler(app, args.seed)
+    queries = QueryCounter()
+    client = app.test_client()
+    results = {}
+    for name, method, path, form in ROUTES:
+        if args.route and name not in args.route:
+            continue
+        for _ in range(args.warmup):
+            request(client, sampler, method, path, form)
+        timings, counts = [], []
+        for _ in range(args.iterations):
+            queries.take()
+            started = time.perf_counter()
+            request(client, sampler, method, path, form)
+            timings.append((time.perf_counter() - started) * 1000)
+            counts.append(queries.take())
+        results[name] = summarize(timings, counts)
+    raise SystemExit(report(results, args.output, args.baseline, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
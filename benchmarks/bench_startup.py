@@ -0,0 +1,90 @@
+"""Worker boot time: a fresh interpreter to a ready app.
+
+    python benchmarks/bench_startup.py --runs 20 --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json   # exits 1 on regression
+
+Starts --runs fresh interpreters per target, each running
+`python -X importtime` on the code that boots a worker (create_app() for
+WSGI, asgi.py for ASGI), and reports the wall time of each process as
+p50/p95/p99 in milliseconds, the part of it spent importing and building
+the app, and the --top packages (first-party modules count as their own
+package) the last run spent longest importing. Nothing touches the
+database, so no seed data is needed. With --baseline, a target whose p95
+grew by more than --tolerance is reported as a regression.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from common import DEFAULT_DATABASE, ROOT, report, summarize
+
+# (name, code that boots a worker of that kind)
+TARGETS = [
+    ('wsgi', 'from app import create_app; create_app()'),
+    ('asgi', 'import asgi'),
+]
+
+CHILD = 'import time; started = time.perf_counter(); {}; print((time.perf_counter() - started) * 1000)'
+
+
+def boot(code, env):
+    # (process wall ms, in-process ms, importtime lines)
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(code)],
+                           cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if child.returncode:
+        raise SystemExit(child.stderr)
+    return wall, float(child.stdout.split()[-1]), child.stderr.splitlines()
+
+
+def slowest_packages(lines, top):
+    # import time per top-level package, from each module's own (self) time,
+    # so nested imports are not counted twice and the entries add up
+    packages = {}
+    for line in lines:
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    found = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return [{"package": package, "self_ms": round(us / 1000, 1)} for package, us in found]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL the app is configured with (it is not connected to)')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per target')
+    parser.add_argument('--target', action='append', help='Only boot these targets (repeatable)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest packages to list per target')
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    parser.add_argument('--baseline', help='Earlier --output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FYYUR_ENV', 'test')
+    env['DATABASE_URL'] = args.database or env.get('BENCH_DATABASE_URL', DEFAULT_DATABASE)
+    env.setdefault('CACHE_BACKEND', 'null')
+
+    results = {}
+    for name, code in TARGETS:
+        if args.target and name not in args.target:
+            continue
+        walls, booted = [], []
+        for _ in range(args.runs):
+            wall, ms, lines = boot(code, env)
+            walls.append(wall)
+            booted.append(ms)
+        result = summarize(walls, [])
+        result["boot_p50_ms"] = round(sorted(booted)[len(booted) // 2], 3)
+        result["slowest_packages"] = slowest_packages(lines, args.top)
+        results[name] = result
+    raise SystemExit(report(results, args.output, args.baseline, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Shared setup for the benchmark scripts: app loading, query counting and
+latency reports.
+
+The scripts run in-process against the Flask test client, so they measure
+the app and its queries without network or server noise. Point them at a
+local Postgres (migrated with `flask db upgrade`) or at a SQLite file, which
+is migrated on first use.
+"""
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(ROOT, 'benchmarks', 'bench.db')
+
+
+def load_app(database=None, cache='null'):
+    """Import the app configured for benchmarking and migrate a SQLite file.
+
+    cache picks CACHE_BACKEND; 'null' measures every request end to end.
+    """
+    database = database or os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE)
+    # the test profile (no CSRF, no debug), unless FYYUR_ENV says otherwise
+    os.environ.setdefault('FYYUR_ENV', 'test')
+    os.environ['DATABASE_URL'] = database
+    os.environ['CACHE_BACKEND'] = cache
+
+    import logging
+    from app import create_app, init_migrations
+    app = create_app()
+    # slow requests are what the benchmark reports; keep them off stderr
+    logging.getLogger('fyyur.sql').addHandler(logging.NullHandler())
+    logging.getLogger('fyyur.sql').propagate = False
+    if database.startswith('sqlite'):
+        from flask_migrate import upgrade
+        init_migrations(app)
+        with app.app_context():
+            upgrade(directory=os.path.join(ROOT, 'migrations'))
+    return app
+
+
+class QueryCounter(object):
+    # statements executed by the current thread since it last called take()
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        self._local = threading.local()
+        event.listen(Engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def take(self):
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+
+def percentile(ordered, fraction):
+    # nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(milliseconds, queries):
+    ordered = sorted(milliseconds)
+    return {
+        "requests": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Names whose p95 grew by more than tolerance, or that run more queries."""
+    found = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append('{}: p95 {} ms -> {} ms'.format(name, before["p95_ms"], result["p95_ms"]))
+        if result["queries_per_request"] > before["queries_per_request"]:
+            found.append('{}: {} -> {} queries per request'.format(
+                name, before["queries_per_request"], result["queries_per_request"]))
+    return found
+
+
+def report(results, output=None, baseline=None, tolerance=0.2):
+    """Write results as JSON and return the exit status for the script."""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as out:
+            out.write(text + '\n')
+    else:
+        print(text)
+    if baseline:
+        with open(baseline) as f:
+            found = regressions(results, json.load(f), tolerance)
+        for line in found:
+            print('REGRESSION ' + line, file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+class Sampler(object):
+    # skewed picks of existing ids and search terms, the way real traffic
+    # favours popular venues and artists
+
+    def __init__(self, app, seed=0):
+        from models import db, Venue, Artist
+        from search import GENRES
+        self.random = random.Random(seed)
+        with app.app_context():
+            self.ids = {
+                'venue': [v for v, in db.session.query(Venue.id).order_by(Venue.id)],
+                'artist': [a for a, in db.session.query(Artist.id).order_by(Artist.id)],
+            }
+        if not self.ids['venue'] or not self.ids['artist']:
+            raise SystemExit('No venues or artists to benchmark; run benchmarks/seed.py first.')
+        self.weights = {kind: list(itertools.accumulate(1.0 / rank for rank in range(1, len(ids) + 1)))
+                        for kind, ids in self.ids.items()}
+        self.terms = list(GENRES.values()) + ['The', 'Hall', 'Band', 'San']
+
+    def pick(self, kind):
+        if kind == 'term':
+            return self.random.choice(self.terms)
+        return self.random.choices(self.ids[kind], cum_weights=self.weights[kind])[0]
+
+    def fill(self, template):
+        """Replace {venue}, {artist} and {term} in a path or form value."""
+        if not isinstance(template, str) or '{' not in template:
+            return template
+        return template.format(**{kind: self.pick(kind) for kind in ('venue', 'artist', 'term')
+                                  if '{' + kind + '}' in template})
@@ -0,0 +1,97 @@
+"""Drive the app with a weighted traffic mix from several threads.
+
+    python benchmarks/replay.py --requests 5000 --threads 8 --output replay.json
+
+The mix is a JSON-lines file, one request shape per line:
+
+    {"name": "show_venue", "method": "GET", "path": "/venues/{venue}", "weight": 20}
+    {"name": "search_venues", "method": "POST", "path": "/venues/search",
+     "form": {"search_term": "{term}"}, "weight": 5}
+
+{venue}, {artist} and {term} are filled per request with skewed picks from
+the database. benchmarks/traffic.jsonl holds the default mix; replace it with
+one distilled from access logs to replay production traffic. The JSON report
+has p50/p95/p99 and statements per request for each name and for "all",
+plus overall throughput.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from common import QueryCounter, Sampler, load_app, report, summarize
+
+DEFAULT_TRAFFIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traffic.jsonl')
+
+
+def read_traffic(path):
+    with open(path) as f:
+        mix = [json.loads(line) for line in f if line.strip()]
+    for entry in mix:
+        entry.setdefault('method', 'GET')
+        entry.setdefault('weight', 1)
+        entry.setdefault('name', entry['path'])
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: $BENCH_DATABASE_URL or benchmarks/bench.db)')
+    parser.add_argument('--cache', default='lru', choices=['null', 'lru'])
+    parser.add_argument('--traffic', default=DEFAULT_TRAFFIC, help='JSON-lines traffic mix')
+    parser.add_argument('--requests', type=int, default=2000, help='Total requests across all threads')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    parser.add_argument('--baseline', help='Earlier --output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    app = load_app(args.database, args.cache)
+    mix = read_traffic(args.traffic)
+    weights = [entry['weight'] for entry in mix]
+    queries = QueryCounter()
+    samples = []
+    lock = threading.Lock()
+
+    def worker(number, count):
+        sampler = Sampler(app, args.seed + number)
+        rng = random.Random(args.seed + number)
+        client = app.test_client()
+        local = []
+        for entry in rng.choices(mix, weights=weights, k=count):
+            form = entry.get('form')
+            data = {key: sampler.fill(value) for key, value in form.items()} if form else None
+            queries.take()
+            started = time.perf_counter()
+            response = client.open(sampler.fill(entry['path']), method=entry['method'], data=data)
+            response.get_data()
+            response.close()
+            local.append((entry['name'], (time.perf_counter() - started) * 1000,
+                          queries.take(), response.status_code))
+        with lock:
+            samples.extend(local)
+
+    per_thread = [args.requests // args.threads + (i < args.requests % args.threads) for i in range(args.threads)]
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in sorted({sample[0] for sample in samples}):
+        matching = [sample for sample in samples if sample[0] == name]
+        results[name] = summarize([s[1] for s in matching], [s[2] for s in matching])
+    results['all'] = summarize([s[1] for s in samples], [s[2] for s in samples])
+    results['all']['errors'] = sum(1 for s in samples if s[3] >= 500)
+    results['all']['requests_per_second'] = round(len(samples) / elapsed, 1)
+    raise SystemExit(report(results, args.output, args.baseline, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Fill a database with synthetic venues, artists and shows.
+
+    python benchmarks/seed.py --venues 500 --artists 2000 --shows 50000
+    python benchmarks/seed.py --database postgresql://localhost/fyyur_bench --reset
+
+Popularity is Zipf-skewed: a few hot venues host most of the shows and a few
+prolific artists play most of them, cities follow the same curve, and start
+times spread a year either side of now. Rows are inserted a batch at a time
+and the show counters and upcoming shows feed rebuilt at the end, as the
+bulk importer does.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from common import load_app
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('San Francisco', 'CA'), ('Chicago', 'IL'),
+    ('Austin', 'TX'), ('Nashville', 'TN'), ('Seattle', 'WA'), ('New Orleans', 'LA'),
+    ('Denver', 'CO'), ('Portland', 'OR'), ('Atlanta', 'GA'), ('Boston', 'MA'),
+    ('Detroit', 'MI'), ('Miami', 'FL'), ('Minneapolis', 'MN'), ('Philadelphia', 'PA'),
+]
+
+WORDS = ['Blue', 'Velvet', 'Electric', 'Midnight', 'Golden', 'Silver', 'Wild', 'Red',
+         'Echo', 'Neon', 'Iron', 'Lucky', 'Crystal', 'Rolling', 'Hollow', 'Paper']
+VENUE_NOUNS = ['Hall', 'Lounge', 'Room', 'Theatre', 'Club', 'Garden', 'Cellar', 'Stage']
+ARTIST_NOUNS = ['Band', 'Collective', 'Trio', 'Quartet', 'Orchestra', 'Project', 'Kids', 'Sound']
+
+
+def zipf_weights(n, skew):
+    return [1.0 / rank ** skew for rank in range(1, n + 1)]
+
+
+def genres(rng, all_genres):
+    return rng.sample(all_genres, rng.choice((1, 1, 2, 2, 3)))
+
+
+def venue_rows(rng, count, all_genres):
+    cities = rng.choices(CITIES, weights=zipf_weights(len(CITIES), 1.0), k=count)
+    for i, (city, state) in enumerate(cities, 1):
+        yield {
+            "name": 'The {} {} {}'.format(rng.choice(WORDS), rng.choice(VENUE_NOUNS), i),
+            "city": city,
+            "state": state,
+            "address": '{} {} St'.format(rng.randint(1, 9999), rng.choice(WORDS)),
+            "phone": '{:010d}'.format(rng.randint(2000000000, 9999999999)),
+            "image_link": 'https://images.example.com/venues/{}.jpg'.format(i),
+            "facebook_link": 'https://www.facebook.com/venue{}'.format(i),
+            "genres": genres(rng, all_genres),
+            "website_link": 'https://venue{}.example.com'.format(i),
+            "seeking_talent": rng.random() < 0.3,
+            "seeking_description": '',
+        }
+
+
+def artist_rows(rng, count, all_genres):
+    cities = rng.choices(CITIES, weights=zipf_weights(len(CITIES), 1.0), k=count)
+    for i, (city, state) in enumerate(cities, 1):
+        yield {
+            "name": '{} {} {}'.format(rng.choice(WORDS), rng.choice(ARTIST_NOUNS), i),
+            "city": city,
+            "state": state,
+            "phone": '{:010d}'.format(rng.randint(2000000000, 9999999999)),
+            "image_link": 'https://images.example.com/artists/{}.jpg'.format(i),
+            "facebook_link": 'https://www.facebook.com/artist{}'.format(i),
+            "genres": genres(rng, all_genres),
+            "website_link": 'https://artist{}.example.com'.format(i),
+            "seeking_venue": rng.random() < 0.3,
+            "seeking_description": '',
+        }
+
+
+def show_rows(rng, count, venue_ids, artist_ids, skew):
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    venues = rng.choices(venue_ids, weights=zipf_weights(len(venue_ids), skew), k=count)
+    artists = rng.choices(artist_ids, weights=zipf_weights(len(artist_ids), skew), k=count)
+    for venue_id, artist_id in zip(venues, artists):
+        yield {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": now + timedelta(hours=rng.randint(-365 * 24, 365 * 24)),
+        }
+
+
+def insert_all(model, rows, batch_size):
+    from sqlalchemy import insert
+    from models import db
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(model), batch)
+            del batch[:]
+    if batch:
+        db.session.execute(insert(model), batch)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLAlchemy URL (default: $BENCH_DATABASE_URL or benchmarks/bench.db)')
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for show popularity')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--reset', action='store_true', help='Delete existing rows first')
+    args = parser.parse_args()
+
+    app = load_app(args.database)
+    from counters import recompute
+    from feed import refresh
+    from forms import choicesGenres
+    from models import db, Venue, Artist, Show
+
+    rng = random.Random(args.seed)
+    all_genres = [value for value, _ in choicesGenres]
+    with app.app_context():
+        if args.reset:
+            for model in (Show, Artist, Venue):
+                db.session.query(model).delete(synchronize_session=False)
+            db.session.commit()
+        # ids are read back in insertion order, so the lowest new ids are
+        # the hot ones; benchmarks/common.Sampler requests them the same way
+        first_venue = db.session.query(db.func.max(Venue.id)).scalar() or 0
+        first_artist = db.session.query(db.func.max(Artist.id)).scalar() or 0
+        insert_all(Venue, venue_rows(rng, args.venues, all_genres), args.batch_size)
+        insert_all(Artist, artist_rows(rng, args.artists, all_genres), args.batch_size)
+        venue_ids = [v for v, in db.session.query(Venue.id).filter(Venue.id > first_venue).order_by(Venue.id)]
+        artist_ids = [a for a, in db.session.query(Artist.id).filter(Artist.id > first_artist).order_by(Artist.id)]
+        insert_all(Show, show_rows(rng, args.shows, venue_ids, artist_ids, args.skew), args.batch_size)
+        recompute(Venue)
+        recompute(Artist)
+        refresh()
+        db.session.commit()
+        print('Seeded {} venues, {} artists and {} shows.'.format(len(venue_ids), len(artist_ids), args.shows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import DateTime, Integer, literal, select, text, union_all
+from counters import record_shows
+from feed import refresh_feed
+from models import db, Venue, Artist, Show
+from tasks import announce_show
+
+#----------------------------------------------------------------------------#
+# Booking.
+#----------------------------------------------------------------------------#
+
+# A show can be booked when its venue and artist exist and neither has
+# another show starting less than SHOW_CONFLICT_HOURS away from it.
+# check_bookings() answers that for any number of proposed shows with one
+# statement: the proposals are a UNION ALL of literal rows, outer-joined to
+# venues and artists, with a correlated MIN(shows.id) per side that is a
+# range read on ix_shows_venue_id_start_time / ix_shows_artist_id_start_time.
+# Proposals that clash with each other are found in Python.
+#
+# Problems come back per proposal in the shape of WTForms' form.errors,
+# {'venue_id': [...], 'artist_id': [...]}, so the form view can show them
+# next to the fields and the API can return them as JSON.
+
+
+def conflict_window():
+    return timedelta(hours=current_app.config.get('SHOW_CONFLICT_HOURS', 4))
+
+
+def lock_calendars(bookings):
+    # hold the venues' and artists' calendars until commit so two requests
+    # cannot both pass the check. Postgres only; SQLite has a single writer.
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    keys = sorted({(1, v) for v, _, _ in bookings} | {(2, a) for _, a, _ in bookings})
+    db.session.execute(
+        text('SELECT pg_advisory_xact_lock(kind, id) FROM unnest(CAST(:kinds AS int[]), CAST(:ids AS int[])) AS k(kind, id)'),
+        {'kinds': [kind for kind, _ in keys], 'ids': [key for _, key in keys]}
+    )
+
+
+def check_bookings(bookings):
+    """Problems with proposed (venue_id, artist_id, start_time) shows.
+
+    Returns {index: {field: [message, ...]}} for the proposals that cannot
+    be booked; empty when all of them can.
+    """
+    if not bookings:
+        return {}
+    window = conflict_window()
+    rows = [
+        select(
+            literal(n, Integer).label('n'),
+            literal(venue_id, Integer).label('venue_id'),
+            literal(artist_id, Integer).label('artist_id'),
+            literal(start_time - window, DateTime).label('earliest'),
+            literal(start_time + window, DateTime).label('latest'),
+        )
+        for n, (venue_id, artist_id, start_time) in enumerate(bookings)
+    ]
+    proposed = (union_all(*rows) if len(rows) > 1 else rows[0]).subquery('proposed')
+
+    def clash(key, proposed_id):
+        return select(db.func.min(Show.id))\
+            .where(key == proposed_id, Show.start_time > proposed.c.earliest, Show.start_time < proposed.c.latest)\
+            .scalar_subquery()
+
+    statement = select(
+        proposed.c.n, Venue.id, Artist.id,
+        clash(Show.venue_id, proposed.c.venue_id), clash(Show.artist_id, proposed.c.artist_id)
+    ).select_from(proposed)\
+        .outerjoin(Venue, Venue.id == proposed.c.venue_id)\
+        .outerjoin(Artist, Artist.id == proposed.c.artist_id)
+
+    problems = {}
+
+    def problem(n, field, message):
+        problems.setdefault(n, {}).setdefault(field, []).append(message)
+
+    for n, venue_id, artist_id, venue_clash, artist_clash in db.session.execute(statement):
+        if venue_id is None:
+            problem(n, 'venue_id', 'There is no venue {}.'.format(bookings[n][0]))
+        elif venue_clash is not None:
+            problem(n, 'venue_id', 'The venue is already booked near that time (show {}).'.format(venue_clash))
+        if artist_id is None:
+            problem(n, 'artist_id', 'There is no artist {}.'.format(bookings[n][1]))
+        elif artist_clash is not None:
+            problem(n, 'artist_id', 'The artist is already booked near that time (show {}).'.format(artist_clash))
+
+    for side, field, label in ((0, 'venue_id', 'venue'), (1, 'artist_id', 'artist')):
+        order = sorted(range(len(bookings)), key=lambda n: (bookings[n][side], bookings[n][2]))
+        for earlier, later in zip(order, order[1:]):
+            if bookings[earlier][side] == bookings[later][side] \
+                    and bookings[later][2] - bookings[earlier][2] < window:
+                problem(later, field, 'The {} is also booked near that time by show {} of this batch.'.format(
+                    label, earlier))
+    return problems
+
+
+def book_shows(bookings):
+    """Add shows for (venue_id, artist_id, start_time) bookings, all or none.
+
+    Returns (shows, problems); nothing is added when there are problems.
+    The caller commits, or rolls back to release the calendar locks.
+    """
+    lock_calendars(bookings)
+    problems = check_bookings(bookings)
+    if problems:
+        return [], problems
+    shows = [Show(venue_id=v, artist_id=a, start_time=start) for v, a, start in bookings]
+    db.session.add_all(shows)
+    record_shows(bookings)
+    db.session.flush()
+    refresh_feed.delay(show_ids=[show.id for show in shows])
+    for show in shows:
+        announce_show.delay(show.id)
+    return shows, {}
+
+
+def parse_bookings(body, limit):
+    """(venue_id, artist_id, start_time) tuples from a tour request body.
+
+    body is {"artist_id": 7, "shows": [{"venue_id": 3, "start_time":
+    "2025-06-01T20:00"}, ...]}, where a show may name its own artist_id.
+    Raises ValueError when it is malformed or has more than limit shows.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get('shows'), list):
+        raise ValueError('expected an object with a "shows" list')
+    if not body['shows'] or len(body['shows']) > limit:
+        raise ValueError('expected 1 to {} shows'.format(limit))
+    bookings = []
+    for show in body['shows']:
+        if not isinstance(show, dict):
+            raise ValueError('each show must be an object')
+        venue_id, artist_id = show.get('venue_id'), show.get('artist_id', body.get('artist_id'))
+        if type(venue_id) is not int or type(artist_id) is not int:
+            raise ValueError('venue_id and artist_id must be integers')
+        start_time = datetime.fromisoformat(str(show.get('start_time')))
+        if start_time.tzinfo is not None:
+            raise ValueError('start_time is local time, without an offset')
+        bookings.append((venue_id, artist_id, start_time))
+    return bookings
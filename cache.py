@@ -0,0 +1,236 @@
+import asyncio
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response
+from metrics import CACHE_LOOKUPS
+from routing import replica_keys
+
+#----------------------------------------------------------------------------#
+# Cache.
+#----------------------------------------------------------------------------#
+
+# Rendered pages are stored under 'page:<name>', view data under 'data:<name>'
+# and template fragments (see templating.py) under 'fragment:<name>', where
+# <name> is e.g. 'venues', 'venue:12' or 'shows?after=..'. Write handlers
+# evict by name, which drops all three entries.
+#
+# With read replicas, a page rendered from a lagging replica just after the
+# write's eviction would put the old rows back for its whole TTL. So every
+# eviction is repeated once REPLICA_STICKY_SECONDS (the lag the routing
+# already allows for) have passed.
+
+
+class NullCache(object):
+
+    shared = True
+    blocking = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+
+class LRUCache(object):
+    # in-process, per-worker cache bounded to maxsize entries
+
+    shared = False
+    blocking = False
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class RedisCache(object):
+    # shared cache for all workers; needs the optional redis package
+
+    shared = True
+    blocking = True
+
+    def __init__(self, url, namespace='fyyur:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def get(self, key):
+        value = self._client.get(self.namespace + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self._client.set(self.namespace + key, pickle.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self.namespace + key for key in keys])
+
+    def delete_prefix(self, prefix):
+        keys = list(self._client.scan_iter(match=self.namespace + prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+
+
+class Cache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.default_ttl = 60
+        self.replica_lag = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'lru')
+        if kind == 'lru':
+            self.backend = LRUCache(app.config.get('CACHE_LRU_SIZE', 1024))
+        elif kind == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        elif kind == 'null':
+            self.backend = NullCache()
+        else:
+            raise ValueError('Unknown CACHE_BACKEND {!r}'.format(kind))
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        self.replica_lag = 0
+        if replica_keys(app.config.get('SQLALCHEMY_BINDS') or {}):
+            self.replica_lag = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        app.extensions['cache'] = self
+
+    @property
+    def shared(self):
+        # whether an eviction made in one process reaches every other one
+        return self.backend.shared
+
+    async def run(self, fn, *args):
+        # call fn(*args) from a coroutine; a backend doing network I/O runs
+        # in a thread (with the request context) so the event loop goes on
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def get(self, key):
+        value = self.backend.get(key)
+        CACHE_LOOKUPS.inc(key.split(':', 1)[0], 'miss' if value is None else 'hit')
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+
+    def get_or_set(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def data(self, name, compute, ttl=None):
+        return self.get_or_set('data:' + name, compute, ttl)
+
+    def evict(self, *names):
+        keys = []
+        for name in names:
+            keys += ['page:' + name, 'data:' + name, 'fragment:' + name]
+        self.backend.delete(*keys)
+        self._again(self.backend.delete, *keys)
+
+    def evict_prefix(self, prefix):
+        self._delete_prefix(prefix)
+        self._again(self._delete_prefix, prefix)
+
+    def _delete_prefix(self, prefix):
+        self.backend.delete_prefix('page:' + prefix)
+        self.backend.delete_prefix('data:' + prefix)
+        self.backend.delete_prefix('fragment:' + prefix)
+
+    def _again(self, delete, *args):
+        # the second eviction, for entries refilled from a lagging replica
+        if self.replica_lag:
+            timer = threading.Timer(self.replica_lag, delete, args)
+            timer.daemon = True
+            timer.start()
+
+    def cached_page(self, name, ttl=None):
+        """Cache a view's rendered 200 response under page:<name>.
+
+        name is a string or a callable taking the view's arguments; a callable
+        may return None to skip the cache for this request. Requests with
+        pending flash messages bypass the cache, since the layout renders
+        them into the page. Coroutine views (see asgi.py) are
+        wrapped in a coroutine, which reaches the backend through run().
+        """
+        def lookup(args, kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return None, None
+            page = name(*args, **kwargs) if callable(name) else name
+            if page is None:
+                return None, None
+            key = 'page:' + page
+            return key, self.get(key)
+
+        def store(key, rv):
+            response = make_response(rv)
+            if key is not None and response.status_code == 200:
+                self.set(key, response.get_data(), ttl)
+            return response
+
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                @wraps(view)
+                async def async_wrapper(*args, **kwargs):
+                    key, body = await self.run(lookup, args, kwargs)
+                    if body is not None:
+                        return body
+                    return await self.run(store, key, await view(*args, **kwargs))
+                return async_wrapper
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key, body = lookup(args, kwargs)
+                if body is not None:
+                    return body
+                return store(key, view(*args, **kwargs))
+            return wrapper
+        return decorator
+
+
+cache = Cache()
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+from cache import cache
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Venue and Artist carry upcoming_shows_count / past_shows_count so listing
+# and search pages can read them without touching shows. Writes keep them in
+# step inside the same transaction; `flask counters rollover` moves shows
+# that have since started from upcoming to past, and `flask counters check`
+# reports (and with --fix repairs) any drift. Both evict the cached pages
+# showing the recounted rows once they commit.
+
+SHOW_KEYS = {Venue: Show.venue_id, Artist: Show.artist_id}
+
+
+def record_shows(shows):
+    # bump both sides of new (venue_id, artist_id, start_time) shows, one
+    # UPDATE ... SET n = n + k per row touched so concurrent submissions do
+    # not lose increments
+    now = datetime.now()
+    increments = {}
+    for venue_id, artist_id, start_time in shows:
+        upcoming = start_time >= now
+        for model, model_id in ((Venue, venue_id), (Artist, artist_id)):
+            key = (model, model_id, upcoming)
+            increments[key] = increments.get(key, 0) + 1
+    for (model, model_id, upcoming), count in increments.items():
+        column = model.upcoming_shows_count if upcoming else model.past_shows_count
+        db.session.query(model).filter(model.id == model_id)\
+            .update({column: column + count}, synchronize_session=False)
+
+
+def _computed(model, now):
+    key = SHOW_KEYS[model]
+    upcoming = select(db.func.count(Show.id))\
+        .where(key == model.id, Show.start_time >= now).scalar_subquery()
+    past = select(db.func.count(Show.id))\
+        .where(key == model.id, Show.start_time < now).scalar_subquery()
+    return upcoming, past
+
+
+def recompute(model, ids=None):
+    """Recount model's counters from shows, for ids or for every row."""
+    upcoming, past = _computed(model, datetime.now())
+    query = db.session.query(model)
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        query = query.filter(model.id.in_(ids))
+    return query.update({
+        model.upcoming_shows_count: upcoming,
+        model.past_shows_count: past
+    }, synchronize_session=False)
+
+
+def rollover(window):
+    # recount every venue and artist with a show that started within the last
+    # `window`; recounting is idempotent, so overlapping runs are harmless.
+    # Returns the recounted venue and artist ids.
+    now = datetime.now()
+    started = db.session.query(Show.venue_id, Show.artist_id)\
+        .filter(Show.start_time >= now - window, Show.start_time < now)\
+        .all()
+    venue_ids = {venue_id for venue_id, _ in started}
+    artist_ids = {artist_id for _, artist_id in started}
+    recompute(Venue, venue_ids)
+    recompute(Artist, artist_ids)
+    return venue_ids, artist_ids
+
+
+def evict_counted(venue_ids, artist_ids):
+    # the listings show the counters and the detail pages split past from
+    # upcoming shows, so both go once recounted rows are committed
+    names = ['venue:{}'.format(v) for v in sorted(venue_ids)] + ['artist:{}'.format(a) for a in sorted(artist_ids)]
+    if venue_ids:
+        names.append('venues')
+    if artist_ids:
+        names.append('artists')
+    cache.evict(*names)
+    if names and not cache.shared:
+        click.echo('The web workers keep their cached pages for up to {}s (CACHE_BACKEND {!r} '
+                   'is per process).'.format(cache.default_ttl, current_app.config.get('CACHE_BACKEND')))
+
+
+def drift(model):
+    # (id, stored upcoming, stored past, actual upcoming, actual past) rows
+    upcoming, past = _computed(model, datetime.now())
+    upcoming, past = upcoming.label('upcoming'), past.label('past')
+    rows = db.session.query(model.id, model.upcoming_shows_count, model.past_shows_count, upcoming, past)\
+        .order_by(model.id)
+    return [row for row in rows if (row[1], row[2]) != (row[3], row[4])]
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+counters_cli = AppGroup('counters', help='Maintain denormalized show counters.')
+
+
+@counters_cli.command('rollover')
+@click.option('--hours', default=24, show_default=True,
+              help='Recount rows with shows that started in this many past hours.')
+def rollover_command(hours):
+    venue_ids, artist_ids = rollover(timedelta(hours=hours))
+    db.session.commit()
+    click.echo('Recounted {} venues and {} artists.'.format(len(venue_ids), len(artist_ids)))
+    evict_counted(venue_ids, artist_ids)
+
+
+@counters_cli.command('check')
+@click.option('--fix', is_flag=True, help='Recount every drifted row.')
+def check_command(fix):
+    drifted = {}
+    for model in (Venue, Artist):
+        rows = drift(model)
+        for model_id, upcoming, past, actual_upcoming, actual_past in rows:
+            click.echo('{} {}: upcoming {} != {}, past {} != {}'.format(
+                model.__tablename__, model_id, upcoming, actual_upcoming, past, actual_past))
+        if rows and fix:
+            recompute(model, [row[0] for row in rows])
+        drifted[model] = {row[0] for row in rows}
+    if fix:
+        db.session.commit()
+        evict_counted(drifted[Venue], drifted[Artist])
+    drifted = drifted[Venue] or drifted[Artist]
+    if not drifted:
+        click.echo('Counters are consistent.')
+    elif not fix:
+        raise SystemExit(1)
@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#----------------------------------------------------------------------------#
+
+# Whole-table (or, with `since`, changed-rows-only) dumps of venues, artists
+# and shows. Rows come off a server-side cursor `batch_size` at a time and
+# are written as they arrive, so memory stays flat whatever the table size.
+# Incremental exports select on the indexed updated_at column; hard deletes
+# are not visible to them, only to a full export.
+
+EXPORTS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+
+
+def export_rows(kind, since=None, batch_size=1000):
+    """Yield one dict per row of kind, oldest id first."""
+    model = EXPORTS[kind]
+    statement = select(*model.__table__.columns).order_by(model.id)
+    if since is not None:
+        statement = statement.where(model.updated_at >= since)
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield row._asdict()
+    finally:
+        # also when the consumer stops early, e.g. a client disconnecting
+        result.close()
+
+
+def json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def ndjson_lines(kind, rows):
+    for row in rows:
+        yield json.dumps(row, default=json_default, separators=(',', ':')) + '\n'
+
+
+def csv_lines(kind, rows):
+    columns = [column.name for column in EXPORTS[kind].__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            ','.join(value) if isinstance(value, list) else value
+            for value in (row[column] for column in columns)
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+LINE_WRITERS = {'ndjson': ndjson_lines, 'csv': csv_lines}
+
+
+def parquet_schema(kind):
+    import pyarrow as pa
+    types = {
+        db.Integer: pa.int64(),
+        db.Boolean: pa.bool_(),
+        db.DateTime: pa.timestamp('us'),
+        db.ARRAY: pa.list_(pa.string()),
+    }
+    fields = []
+    for column in EXPORTS[kind].__table__.columns:
+        arrow_type = next((t for base, t in types.items() if isinstance(column.type, base)), pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def write_parquet(kind, rows, path, batch_size=1000):
+    # one row group per batch keeps memory bounded; needs the optional pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(kind)
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                del batch[:]
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def parse_since(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+@click.command('export')
+@click.argument('kinds', nargs=-1, type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'format', type=click.Choice(FORMATS), default='ndjson', show_default=True)
+@click.option('--since', help='Only rows updated at or after this ISO 8601 timestamp.')
+@click.option('--output', default='-', show_default=True,
+              help="Directory to write <kind>.<format> files into, or '-' for stdout.")
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per cursor fetch.')
+@with_appcontext
+def export_command(kinds, format, since, output, batch_size):
+    """Export venues, artists and/or shows (all three by default)."""
+    kinds = kinds or tuple(EXPORTS)
+    since = parse_since(since)
+    if output == '-' and (format == 'parquet' or len(kinds) > 1):
+        raise click.UsageError('Use --output DIR for parquet or for more than one kind.')
+    for kind in kinds:
+        rows = export_rows(kind, since, batch_size)
+        if output == '-':
+            sys.stdout.writelines(LINE_WRITERS[format](kind, rows))
+            continue
+        path = os.path.join(output, '{}.{}'.format(kind, format))
+        if format == 'parquet':
+            write_parquet(kind, rows, path, batch_size)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as out:
+                out.writelines(LINE_WRITERS[format](kind, rows))
+        click.echo('Wrote {}'.format(path), err=True)
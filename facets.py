@@ -0,0 +1,105 @@
+from urllib.parse import urlencode
+from sqlalchemy import literal, null, select, true, union_all
+from sqlalchemy.dialects import postgresql
+from choices import choicesGenres
+from models import db
+
+#----------------------------------------------------------------------------#
+# Filters and facets.
+#----------------------------------------------------------------------------#
+
+# The venue and artist listings and searches take ?genre= (repeatable, all
+# must match), ?city=, ?state= and ?upcoming=1 (has upcoming shows). Genres
+# are matched with @> on Postgres, through the GIN index on the array column,
+# and through json_each() on SQLite; city/state use ix_<table>_state_city.
+#
+# Alongside the rows, a page gets facet counts (rows per genre and per
+# city/state among everything matching) from one UNION ALL of two grouped
+# selects, so a faceted page costs a constant number of statements.
+
+GENRES = {value.lower(): value for value, _ in choicesGenres}
+
+NO_FILTERS = {"genres": [], "city": None, "state": None, "upcoming": False}
+
+
+def parse_filters(values):
+    """Filters from request args or form values; unknown genres are dropped."""
+    genres = {GENRES[g.strip().lower()] for g in values.getlist('genre') if g.strip().lower() in GENRES}
+    return {
+        "genres": sorted(genres),
+        "city": (values.get('city') or '').strip() or None,
+        "state": (values.get('state') or '').strip().upper() or None,
+        "upcoming": values.get('upcoming') in ('1', 'true', 'on'),
+    }
+
+
+def filter_query(filters, **changes):
+    # the filters as a query string, e.g. for facet links that add a genre
+    filters = dict(filters, **changes)
+    pairs = [('genre', genre) for genre in filters['genres']]
+    pairs += [(key, filters[key]) for key in ('city', 'state') if filters[key]]
+    if filters['upcoming']:
+        pairs.append(('upcoming', '1'))
+    return urlencode(pairs)
+
+
+def _genre_values(genres, dialect):
+    # one row per element of a genres column, joined against its table
+    if dialect == 'sqlite':
+        return db.func.json_each(genres).table_valued('value')
+    # unnest() of a scalar array names its column after the alias unless told
+    return db.func.unnest(genres).table_valued('value').render_derived()
+
+
+def filter_clauses(model, filters, dialect):
+    clauses = []
+    if filters['genres']:
+        if dialect == 'sqlite':
+            for genre in filters['genres']:
+                values = _genre_values(model.genres, dialect)
+                clauses.append(select(literal(1)).select_from(values).where(values.c.value == genre).exists())
+        else:
+            # models use the generic ARRAY type, so spell out @> for the GIN index
+            clauses.append(model.genres.op('@>')(postgresql.array(filters['genres'])))
+    if filters['city']:
+        clauses.append(model.city == filters['city'])
+    if filters['state']:
+        clauses.append(model.state == filters['state'])
+    if filters['upcoming']:
+        clauses.append(model.upcoming_shows_count > 0)
+    return clauses
+
+
+def facet_statement(model, filters, dialect, hits=None):
+    """(facet, value, state, count) rows for model rows matching filters.
+
+    facet is 'genre' (state is NULL) or 'city'. hits is an optional (id, ...)
+    subquery, such as search.search_hits(), that the rows must also be in.
+    """
+    matching = select(model.id, model.genres, model.city, model.state).where(*filter_clauses(model, filters, dialect))
+    if hits is not None:
+        matching = matching.join(hits, hits.c.id == model.id)
+    matching = matching.cte('matching')
+    values = _genre_values(matching.c.genres, dialect)
+    genres = select(literal('genre').label('facet'), values.c.value, null().label('state'), db.func.count())\
+        .select_from(matching).join(values, true())\
+        .group_by(values.c.value)
+    cities = select(literal('city').label('facet'), matching.c.city, matching.c.state, db.func.count())\
+        .group_by(matching.c.city, matching.c.state)
+    return union_all(genres, cities)
+
+
+def facets_from_rows(rows):
+    genres, cities = [], []
+    for facet, value, state, count in rows:
+        if facet == 'genre':
+            genres.append({"genre": value, "count": count})
+        else:
+            cities.append({"city": value, "state": state, "count": count})
+    genres.sort(key=lambda f: (-f["count"], f["genre"]))
+    cities.sort(key=lambda f: (-f["count"], f["city"] or '', f["state"] or ''))
+    return {"genres": genres, "cities": cities}
+
+
+def filtered(filters):
+    return any(filters.values())
@@ -0,0 +1,132 @@
+import time
+from datetime import date, datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, or_, select, text
+from cache import cache
+from models import db, Venue, Artist, Show, ShowFeed
+from tasks import task
+
+#----------------------------------------------------------------------------#
+# Upcoming shows feed.
+#----------------------------------------------------------------------------#
+
+# /shows reads from show_feed, a summary table holding one row per show from
+# the start of today onwards with its venue's city and the venue and artist
+# names already joined in. A page of it (?from=, ?to=, ?city=) is then a
+# range read on ix_show_feed_start_time_show_id or
+# ix_show_feed_city_start_time_show_id rather than a three-table join.
+#
+# The table is derived from shows, venues and artists and is rebuilt in one
+# transaction, so readers keep seeing the previous rows until it commits:
+#   - after a write, the handler queues refresh_feed.delay(...) for the
+#     shows, venues or artists it touched, which replaces just their rows
+#   - `flask feed refresh` rebuilds it all and drops shows from before today;
+#     run it from cron (or with --every) so the feed rolls over each day
+# Both evict the cached /shows pages once the new rows are committed, from
+# the process they run in. That reaches the web workers when it is one of
+# them (the 'thread' and 'eager' task backends) or the cache is shared
+# (redis); tasks.py refuses the 'database' backend otherwise. A per-process
+# cache left behind by the command expires within CACHE_DEFAULT_TTL.
+
+
+def feed_start():
+    # shows that started earlier today stay listed until the next day
+    return datetime.combine(date.today(), datetime.min.time())
+
+
+def feed_rows():
+    return select(
+        Show.id, Show.start_time, Venue.city, Venue.state,
+        Venue.id, Venue.name, Artist.id, Artist.name, Artist.image_link
+    ).join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .where(Show.start_time >= feed_start())
+
+
+FEED_COLUMNS = ['show_id', 'start_time', 'city', 'state', 'venue_id', 'venue_name',
+                'artist_id', 'artist_name', 'artist_image_link']
+
+
+def lock_feed():
+    # one refresh at a time, so two cannot insert the same show. Postgres
+    # only; SQLite has a single writer.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext('show_feed'))"))
+
+
+def refresh(show_ids=None, venue_ids=None, artist_ids=None):
+    """Rebuild the feed rows of the given shows, venues and artists.
+
+    With no ids the whole feed is rebuilt. Returns the number of rows now
+    in it for those ids. The caller commits.
+    """
+    lock_feed()
+    if show_ids is None and venue_ids is None and artist_ids is None:
+        db.session.execute(delete(ShowFeed))
+        rows = feed_rows()
+    else:
+        current, source = [], []
+        for ids, feed_key, key in ((show_ids, ShowFeed.show_id, Show.id),
+                                   (venue_ids, ShowFeed.venue_id, Show.venue_id),
+                                   (artist_ids, ShowFeed.artist_id, Show.artist_id)):
+            if ids:
+                current.append(feed_key.in_(ids))
+                source.append(key.in_(ids))
+        if not current:
+            return 0
+        db.session.execute(delete(ShowFeed).where(or_(*current)))
+        rows = feed_rows().where(or_(*source))
+    result = db.session.execute(insert(ShowFeed).from_select(FEED_COLUMNS, rows))
+    return result.rowcount
+
+
+def evict_feed_pages(show_ids=None):
+    cache.evict_prefix('shows')
+    if show_ids is None:
+        cache.evict_prefix('show:')
+    else:
+        cache.evict(*['show:{}'.format(s) for s in show_ids])
+
+
+@task
+def refresh_feed(show_ids=None, venue_ids=None, artist_ids=None):
+    # after show, venue and artist writes. The pages are evicted again once
+    # the new rows are committed, since one rendered between the write's
+    # commit and this refresh would still hold the old rows.
+    changed = None
+    if show_ids is not None or venue_ids is not None or artist_ids is not None:
+        changed = set(show_ids or ())
+        for ids, key in ((venue_ids, Show.venue_id), (artist_ids, Show.artist_id)):
+            if ids:
+                changed.update(s for s, in db.session.query(Show.id).filter(key.in_(ids)))
+    refresh(show_ids, venue_ids, artist_ids)
+    db.session.commit()
+    evict_feed_pages(changed)
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+feed_cli = AppGroup('feed', help='Maintain the upcoming shows feed.')
+
+
+@feed_cli.command('refresh')
+@click.option('--every', type=float, help='Keep refreshing, this many seconds apart.')
+def refresh_command(every):
+    """Rebuild the upcoming shows feed."""
+    while True:
+        started = time.perf_counter()
+        rows = refresh()
+        db.session.commit()
+        evict_feed_pages()
+        click.echo('Refreshed the feed: {} upcoming shows in {:.0f} ms.'.format(
+            rows, (time.perf_counter() - started) * 1000))
+        if not cache.shared:
+            click.echo('The web workers keep their cached /shows pages for up to {}s (CACHE_BACKEND {!r} '
+                       'is per process).'.format(cache.default_ttl, current_app.config.get('CACHE_BACKEND')))
+        if not every:
+            return
+        time.sleep(every)
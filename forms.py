@@ -1,38 +1,21 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, ValidationError
-from wtforms.validators import DataRequired, AnyOf, URL, Length
-
-choicesGenres = [
-    ('Alternative', 'Alternative'),
-    ('Blues', 'Blues'),
-    ('Classical', 'Classical'),
-    ('Country', 'Country'),
-    ('Electronic', 'Electronic'),
-    ('Folk', 'Folk'),
-    ('Funk', 'Funk'),
-    ('Hip-Hop', 'Hip-Hop'),
-    ('Heavy Metal', 'Heavy Metal'),
-    ('Instrumental', 'Instrumental'),
-    ('Jazz', 'Jazz'),
-    ('Musical Theatre', 'Musical Theatre'),
-    ('Pop', 'Pop'),
-    ('Punk', 'Punk'),
-    ('R&B', 'R&B'),
-    ('Reggae', 'Reggae'),
-    ('Rock n Roll', 'Rock n Roll'),
-    ('Soul', 'Soul'),
-    ('Other', 'Other'),
-]
+from wtforms import StringField, IntegerField, SelectField, SelectMultipleField, DateTimeField, BooleanField, ValidationError
+from wtforms.validators import DataRequired, AnyOf, URL, Length, NumberRange
+from wtforms.widgets import TextInput
+from choices import choicesGenres
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    # that both ids exist, and that neither side is double-booked, is checked
+    # against the database by booking.book_shows(). Text inputs, so a name can
+    # be typed to get id suggestions.
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired(), NumberRange(min=1)], widget=TextInput()
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired(), NumberRange(min=1)], widget=TextInput()
     )
-    start_time = DateTimeField('start_time', validators=[DataRequired()], default=datetime.now())
+    start_time = DateTimeField('start_time', validators=[DataRequired()], default=datetime.now)
 
 
 
@@ -0,0 +1,318 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, tuple_
+from werkzeug.datastructures import MultiDict
+from autocomplete import autocomplete
+from booking import check_bookings, lock_calendars
+from cache import cache
+from counters import recompute
+from feed import refresh
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# Rows are read lazily from CSV or NDJSON, validated one at a time with the
+# same form rules the create pages use, and inserted a batch at a time with a
+# single executemany INSERT. Duplicates are skipped on natural keys, both
+# within the input and against what is already stored:
+#   venues/artists: (name, city, state), name compared case-insensitively
+#   shows:          (venue_id, artist_id, start_time)
+# Shows are then held to the same rules as a booking (booking.py): each batch
+# goes through check_bookings() in one statement, and a show whose venue or
+# artist is missing or double-booked is reported as an error for its row.
+
+
+class ImportResult(object):
+
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors = []
+
+    def error(self, record, messages):
+        self.errors.append({"record": record, "errors": messages})
+
+    def as_dict(self):
+        return {"inserted": self.inserted, "duplicates": self.duplicates, "errors": self.errors}
+
+
+def read_rows(stream, format):
+    """Yield (row, parse error) pairs from a text stream of CSV or NDJSON."""
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            if row.get('genres'):
+                row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+            yield row, None
+    elif format == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, 'Invalid JSON on line {}: {}'.format(number, e)
+    else:
+        raise ValueError('Unknown import format {!r}'.format(format))
+
+
+def formdata(row):
+    # {field: [raw strings]} as forms would receive them; BooleanField treats
+    # any string other than 'false' or '' as checked, so booleans need
+    # spelling out
+    data = {}
+    for key, value in row.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            data[key] = ('y',) if value else ('',)
+        elif isinstance(value, list):
+            data[key] = tuple(str(item) for item in value)
+        else:
+            data[key] = (str(value),)
+    return data
+
+
+class RowValidator(object):
+    # Runs the form's field validators without building a form per row. The
+    # validators are pure, so each field's (errors, data) is memoized per raw
+    # value; URLs, states and genres repeat heavily in real feeds, and a row
+    # whose every field is a memo hit never touches WTForms at all.
+
+    MEMO_SIZE = 100000
+
+    def __init__(self, form_class):
+        self.form = form_class(formdata=None, meta={'csrf': False})
+        self.inline = {}
+        for name in self.form._fields:
+            inline = getattr(form_class, 'validate_' + name, None)
+            if inline is not None:
+                self.inline[name] = [inline]
+        self.memo = {}
+
+    def validate(self, data):
+        """Return (errors, values) for a formdata() dict."""
+        errors = {}
+        values = {}
+        formdata = None
+        for name, field in self.form._fields.items():
+            key = (name, data.get(name, ()))
+            result = self.memo.get(key)
+            if result is None:
+                if formdata is None:
+                    formdata = MultiDict({k: list(v) for k, v in data.items()})
+                field.process(formdata)
+                field.validate(self.form, self.inline.get(name, ()))
+                result = (list(field.errors), field.data)
+                if len(self.memo) >= self.MEMO_SIZE:
+                    self.memo.clear()
+                self.memo[key] = result
+            if result[0]:
+                errors[name] = result[0]
+            values[name] = result[1]
+        return errors, values
+
+
+def venue_values(data):
+    return {
+        "name": data['name'],
+        "city": data['city'],
+        "state": data['state'],
+        "address": data['address'],
+        "phone": re.sub(r'\D', '', data['phone']),
+        "image_link": data['image_link'],
+        "genres": data['genres'],
+        "facebook_link": data['facebook_link'],
+        "website_link": data['website_link'],
+        "seeking_talent": data['seeking_talent'],
+        "seeking_description": data['seeking_description'],
+    }
+
+
+def artist_values(data):
+    return {
+        "name": data['name'],
+        "city": data['city'],
+        "state": data['state'],
+        "phone": re.sub(r'\D', '', data['phone']),
+        "image_link": data['image_link'],
+        "genres": data['genres'],
+        "facebook_link": data['facebook_link'],
+        "website_link": data['website_link'],
+        "seeking_venue": data['seeking_venue'],
+        "seeking_description": data['seeking_description'],
+    }
+
+
+def show_values(data):
+    return {
+        "venue_id": int(data['venue_id']),
+        "artist_id": int(data['artist_id']),
+        "start_time": data['start_time'],
+    }
+
+
+def named_key(values):
+    return (values['name'].lower(), values['city'], values['state'])
+
+
+def show_key(values):
+    return (values['venue_id'], values['artist_id'], values['start_time'])
+
+
+def existing_named_keys(model, keys):
+    # an index scan on ix_<table>_name_key, which covers the selected columns
+    rows = db.session.query(db.func.lower(model.name), model.city, model.state)\
+        .filter(db.func.lower(model.name).in_({key[0] for key in keys}))
+    return set(map(tuple, rows))
+
+
+def existing_show_keys(model, keys):
+    rows = db.session.query(Show.venue_id, Show.artist_id, Show.start_time)\
+        .filter(tuple_(Show.venue_id, Show.artist_id, Show.start_time).in_(list(keys)))
+    return set(map(tuple, rows))
+
+
+def bookable(batch, result):
+    # the (record, values) pairs of batch that check_bookings() accepts; the
+    # rest are reported against their records. The calendars stay locked
+    # until flush() commits the insert.
+    bookings = [show_key(values) for _, values in batch]
+    lock_calendars(bookings)
+    problems = check_bookings(bookings)
+    for n in sorted(problems):
+        result.error(batch[n][0], problems[n])
+    return [item for n, item in enumerate(batch) if n not in problems]
+
+
+def normalize_show(row):
+    # accept ISO 8601 start times (as the API emits) alongside the form's
+    # format; a missing one must not fall back to the form's default of now
+    start_time = row.get('start_time')
+    if not start_time:
+        raise ValueError('start_time is required.')
+    if isinstance(start_time, str):
+        try:
+            row['start_time'] = datetime.fromisoformat(start_time).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    return row
+
+
+IMPORTERS = {
+    'venues': (Venue, 'VenueForm', venue_values, named_key, existing_named_keys),
+    'artists': (Artist, 'ArtistForm', artist_values, named_key, existing_named_keys),
+    'shows': (Show, 'ShowForm', show_values, show_key, existing_show_keys),
+}
+
+
+def import_rows(kind, rows, batch_size=1000):
+    """Validate and insert (row, parse error) pairs; returns an ImportResult."""
+    # forms (and WTForms) are imported on first use, not when the app starts
+    import forms
+    model, form_name, values_for, key_for, existing_keys = IMPORTERS[kind]
+    validator = RowValidator(getattr(forms, form_name))
+    if model is Show:
+        # check_bookings() takes a batch in one statement, which is as many
+        # shows as a booking request may have
+        batch_size = min(batch_size, current_app.config.get('SHOW_BATCH_MAX', 500))
+    result = ImportResult()
+    seen = set()
+    batch = []
+    touched = {Venue: set(), Artist: set()}
+
+    def flush():
+        if not batch:
+            return
+        existing = existing_keys(model, {key_for(values) for _, values in batch})
+        fresh = [(record, values) for record, values in batch if key_for(values) not in existing]
+        result.duplicates += len(batch) - len(fresh)
+        if model is Show:
+            fresh = bookable(fresh, result)
+        fresh = [values for _, values in fresh]
+        if fresh:
+            db.session.execute(insert(model), fresh)
+            if model is Show:
+                touched[Venue].update(values['venue_id'] for values in fresh)
+                touched[Artist].update(values['artist_id'] for values in fresh)
+        db.session.commit()
+        result.inserted += len(fresh)
+        del batch[:]
+
+    for record, (row, parse_error) in enumerate(rows, 1):
+        if parse_error:
+            result.error(record, {"row": [parse_error]})
+            continue
+        try:
+            if model is Show:
+                row = normalize_show(row)
+            errors, values = validator.validate(formdata(row))
+            if errors:
+                result.error(record, errors)
+                continue
+            values = values_for(values)
+        except (AttributeError, TypeError, ValueError) as e:
+            result.error(record, {"row": [str(e)]})
+            continue
+        key = key_for(values)
+        if key in seen:
+            result.duplicates += 1
+            continue
+        seen.add(key)
+        batch.append((record, values))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if model is Show:
+        for counted, ids in touched.items():
+            ids = sorted(ids)
+            for start in range(0, len(ids), batch_size):
+                recompute(counted, ids[start:start + batch_size])
+        venue_ids = sorted(touched[Venue])
+        for start in range(0, len(venue_ids), batch_size):
+            refresh(venue_ids=venue_ids[start:start + batch_size])
+        db.session.commit()
+        cache.evict('venues', *['venue:{}'.format(v) for v in touched[Venue]] +
+                    ['artist:{}'.format(a) for a in touched[Artist]])
+        cache.evict_prefix('shows')
+        autocomplete.invalidate('venues')
+        autocomplete.invalidate('artists')
+    elif result.inserted:
+        cache.evict(kind)
+        autocomplete.invalidate(kind)
+    return result
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per INSERT.')
+@with_appcontext
+def import_command(kind, source, format, batch_size):
+    """Bulk import venues, artists or shows from a CSV or NDJSON file."""
+    if format is None:
+        format = 'csv' if source.name.endswith('.csv') else 'ndjson'
+    started = datetime.now()
+    result = import_rows(kind, read_rows(source, format), batch_size)
+    elapsed = (datetime.now() - started).total_seconds()
+    for error in result.errors:
+        click.echo('record {}: {}'.format(error['record'], json.dumps(error['errors'])), err=True)
+    click.echo('{} inserted, {} duplicates skipped, {} errors in {:.1f}s'.format(
+        result.inserted, result.duplicates, len(result.errors), elapsed))
+
+
+def read_request_rows(request):
+    # rows from a request body, without buffering it whole
+    format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+    return read_rows(stream, format)
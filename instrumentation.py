@@ -0,0 +1,187 @@
+import json
+import logging
+import re
+import time
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+# Every statement run while handling a request is timed through the engine's
+# cursor events and folded into that request's QueryStats. Responses carry a
+# Server-Timing header (`db` and `app` durations, statement count), and a
+# request that runs more than SQL_SLOW_REQUEST_STATEMENTS statements, takes
+# longer than SQL_SLOW_REQUEST_MS, or repeats one statement shape more than
+# SQL_N_PLUS_ONE_THRESHOLD times is written to the 'fyyur.sql' logger as one
+# JSON object per line.
+#
+# Statements are grouped by shape: literals and bound parameters collapse to
+# '?', and IN lists to '(?)', so `WHERE shows.venue_id = ?` run once per
+# venue shows up as one shape with a high count.
+
+_PARAMETERS = re.compile(
+    r"'(?:[^']|'')*'"              # string literals
+    r"|%\(\w+\)s|%s|\?|(?<!:):\w+"  # pyformat, format, qmark and named params
+    r"|\b\d+(?:\.\d+)?\b"          # numbers
+)
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def statement_shape(statement):
+    shape = _PARAMETERS.sub('?', statement)
+    shape = _LISTS.sub('(?)', shape)
+    return ' '.join(shape.split())
+
+
+class QueryStats(object):
+    # per-request totals, plus count/time/sample SQL for each statement shape
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.shapes = {}
+
+    def record(self, statement, duration, rowcount):
+        self.statements += 1
+        self.duration += duration
+        # drivers report -1 for SELECTs they have not counted (sqlite3 does
+        # so for every SELECT), so rows is a lower bound there
+        self.rows += max(rowcount, 0)
+        shape = statement_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = entry = {"count": 0, "ms": 0.0, "sql": statement}
+        entry["count"] += 1
+        entry["ms"] += duration * 1000
+        if duration * 1000 > entry.get("slowest_ms", 0):
+            entry["slowest_ms"] = duration * 1000
+            entry["sql"] = statement
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def repeated(self, threshold):
+        return [
+            {"shape": shape, "count": entry["count"], "ms": round(entry["ms"], 2)}
+            for shape, entry in self.shapes.items() if entry["count"] > threshold
+        ]
+
+    def slowest(self, limit=10):
+        entries = sorted(self.shapes.values(), key=lambda entry: entry["ms"], reverse=True)[:limit]
+        return [
+            {"sql": entry["sql"], "count": entry["count"], "ms": round(entry["ms"], 2)}
+            for entry in entries
+        ]
+
+    def server_timing(self):
+        return 'db;dur={:.2f};desc="{} queries", app;dur={:.2f}'.format(
+            self.duration * 1000, self.statements, self.elapsed() * 1000)
+
+
+def current_stats():
+    return g.get('_sql_stats') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = conn.info.get('query_started')
+    if stats is None or not started:
+        return
+    stats.record(statement, time.perf_counter() - started.pop(), cursor.rowcount)
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {"time": self.formatTime(record), "level": record.levelname}
+        entry.update(record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()})
+        return json.dumps(entry, default=str)
+
+
+class Instrumentation(object):
+
+    _listening = False
+
+    def __init__(self, app=None):
+        self.logger = logging.getLogger('fyyur.sql')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('SQL_STATS_ENABLED', True):
+            return
+        if not Instrumentation._listening:
+            # the engine is created lazily and per app, so listen on the class
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            Instrumentation._listening = True
+
+        path = app.config.get('SQL_SLOW_LOG')
+        if path and not self.logger.handlers:
+            # opened on the first slow request, as app.py does for error.log
+            handler = logging.FileHandler(path, delay=True)
+            handler.setFormatter(JSONFormatter())
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        app.extensions['instrumentation'] = self
+
+    def start(self):
+        g._sql_stats = QueryStats()
+
+    def finish(self, response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        response.headers['Server-Timing'] = stats.server_timing()
+        config = {
+            "statements": current_app.config.get('SQL_SLOW_REQUEST_STATEMENTS', 50),
+            "ms": current_app.config.get('SQL_SLOW_REQUEST_MS', 500),
+            "repeats": current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10),
+        }
+        method, path, status = request.method, request.full_path.rstrip('?'), response.status_code
+        # streamed bodies keep querying after this point, so judge the
+        # request once the response has been closed
+        response.call_on_close(lambda: self.report(stats, config, method, path, status))
+        return response
+
+    def report(self, stats, config, method, path, status):
+        elapsed_ms = stats.elapsed() * 1000
+        repeated = stats.repeated(config["repeats"])
+        reasons = []
+        if stats.statements > config["statements"]:
+            reasons.append('statements')
+        if elapsed_ms > config["ms"]:
+            reasons.append('latency')
+        if repeated:
+            reasons.append('n+1')
+        if not reasons:
+            return
+        self.logger.warning({
+            "method": method,
+            "path": path,
+            "status": status,
+            "reasons": reasons,
+            "ms": round(elapsed_ms, 2),
+            "db_ms": round(stats.duration * 1000, 2),
+            "statements": stats.statements,
+            "rows": stats.rows,
+            "n_plus_one": repeated,
+            "slowest": stats.slowest(),
+        })
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,278 @@
+import bisect
+import threading
+import time
+import weakref
+from flask import Response, current_app, g, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+# Counters and histograms in the Prometheus text format, served from
+# /metrics. Each thread writes to its own shard of every metric, so recording
+# a value takes no lock; the shards are only summed when /metrics is scraped.
+# The one lock is taken the first time a thread touches a metric, and again
+# when the thread exits and its shard is folded into the metric's retired
+# totals, so short-lived threads do not pile up shards.
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        pairs.append('{}="{}"'.format(name, value))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(object):
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # dropped with the thread's locals when the thread exits
+            self._local.owner = _ThreadOwner()
+            weakref.finalize(self._local.owner, self._retire, shard)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            self._merge(self._retired, shard)
+
+    def values(self):
+        totals = {}
+        with self._lock:
+            self._merge(totals, self._retired)
+            shards = list(self._shards)
+        for shard in shards:
+            self._merge(totals, shard)
+        return totals
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.help), '# TYPE {} {}'.format(self.name, self.kind)]
+        lines += self._samples()
+        return lines
+
+
+class _ThreadOwner(object):
+    # a weakref-able stand-in for the thread in its thread-local storage
+    pass
+
+
+class Counter(Metric):
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, totals, shard):
+        for labels, value in list(shard.items()):
+            totals[labels] = totals.get(labels, 0) + value
+
+    def _samples(self):
+        return [
+            '{}{} {}'.format(self.name, _labels(self.labels, labels), _number(value))
+            for labels, value in sorted(self.values().items())
+        ]
+
+
+class Histogram(Metric):
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # one slot per bucket plus +Inf, then the running sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, totals, shard):
+        for labels, counts in list(shard.items()):
+            total = totals.setdefault(labels, [0] * len(counts))
+            for i, count in enumerate(list(counts)):
+                total[i] += count
+
+    def _samples(self):
+        lines = []
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for labels, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name, _labels(self.labels + ('le',), labels + (bound,)), cumulative))
+            lines.append('{}_sum{} {}'.format(self.name, _labels(self.labels, labels), _number(counts[-1])))
+            lines.append('{}_count{} {}'.format(self.name, _labels(self.labels, labels), cumulative))
+        return lines
+
+
+class Gauge(object):
+    # read when scraped: collect() returns {label values: number}
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels, collect):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.help), '# TYPE {} gauge'.format(self.name)]
+        for labels, value in sorted(self.collect().items()):
+            lines.append('{}{} {}'.format(self.name, _labels(self.labels, labels), _number(value)))
+        return lines
+
+
+REQUESTS = Counter('fyyur_http_requests_total', 'Requests handled, by view.', ('endpoint', 'method', 'status'))
+REQUEST_DURATION = Histogram('fyyur_http_request_duration_seconds', 'Time spent in each view.', ('endpoint',))
+TEMPLATE_DURATION = Histogram('fyyur_template_render_seconds', 'Time spent rendering each template.', ('template',))
+POOL_WAIT = Histogram('fyyur_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection.')
+CACHE_LOOKUPS = Counter('fyyur_cache_lookups_total', 'Cache lookups, by entry kind and result.', ('kind', 'result'))
+
+
+def cache_hit_ratio():
+    lookups = CACHE_LOOKUPS.values()
+    ratios = {}
+    for kind in sorted({labels[0] for labels in lookups}):
+        hits = lookups.get((kind, 'hit'), 0)
+        total = hits + lookups.get((kind, 'miss'), 0)
+        ratios[(kind,)] = hits / total if total else 0.0
+    return ratios
+
+
+# A session statement that needs a connection checks one out before it runs,
+# blocking while every connection is in use and the overflow is used up. The
+# wait is the time from the session's do_orm_execute to the pool's checkout
+# event on the same thread; before_cursor_execute drops the mark when the
+# statement ran on a connection the session already held. Pool events
+# registered on the engine carry over when dispose() replaces its pool.
+_checkout = threading.local()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_checkout(orm_execute_state):
+    _checkout.started = time.perf_counter()
+
+
+def _time_checkout(dbapi_connection, connection_record, connection_proxy):
+    started = getattr(_checkout, 'started', None)
+    if started is not None:
+        _checkout.started = None
+        POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def _clear_checkout(*args):
+    _checkout.started = None
+
+
+def time_pool_checkouts(engine):
+    event.listen(engine, 'checkout', _time_checkout)
+    event.listen(engine, 'before_cursor_execute', _clear_checkout)
+
+
+def pool_usage(engine):
+    def collect():
+        pool = engine.pool
+        usage = {}
+        for state, read in (('size', 'size'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+            # SingletonThreadPool/StaticPool (sqlite) lack some of these
+            if hasattr(pool, read):
+                usage[(state,)] = getattr(pool, read)()
+        if ('overflow',) in usage:
+            # QueuePool counts overflow from -size while the pool fills up
+            usage[('overflow',)] = max(usage[('overflow',)], 0)
+        return usage
+    return collect
+
+
+class Metrics(object):
+
+    def __init__(self, app=None):
+        self.metrics = [REQUESTS, REQUEST_DURATION, TEMPLATE_DURATION, POOL_WAIT, CACHE_LOOKUPS]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, db=None):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        # the gauges read this app's pool, so each app keeps its own list
+        gauges = []
+        if db is not None:
+            with app.app_context():
+                engine = db.engine
+            time_pool_checkouts(engine)
+            gauges.append(Gauge('fyyur_db_pool_connections', 'Connections in the pool, by state.',
+                                ('state',), pool_usage(engine)))
+        gauges.append(Gauge('fyyur_cache_hit_ratio', 'Share of cache lookups that hit, by entry kind.',
+                            ('kind',), cache_hit_ratio))
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        app.extensions['metrics'] = gauges
+
+    def start(self):
+        g._metrics_started = time.perf_counter()
+
+    def finish(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - started, endpoint)
+            REQUESTS.inc(endpoint, request.method, response.status_code)
+        return response
+
+    def start_render(self, app, template, context, **extra):
+        g.setdefault('_render_started', []).append(time.perf_counter())
+
+    def finish_render(self, app, template, context, **extra):
+        started = g.get('_render_started')
+        if started:
+            TEMPLATE_DURATION.observe(time.perf_counter() - started.pop(), template.name)
+
+    def render(self, gauges=()):
+        lines = []
+        for metric in self.metrics + list(gauges):
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        return Response(self.render(current_app.extensions['metrics']), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,36 @@
+"""updated_at timestamps on venues, artists and shows
+
+Revision ID: 1f6d0b83a9e4
+Revises: e4a7b2d91c05
+Create Date: 2026-10-18 12:40:08.266191
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f6d0b83a9e4'
+down_revision = 'e4a7b2d91c05'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows')
+
+
+def upgrade():
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table in TABLES:
+        # SQLite cannot ADD COLUMN with a non-constant default; rebuilding the
+        # table instead would drop the FTS triggers, so backfill separately
+        default = sa.text("'1970-01-01 00:00:00'") if sqlite else sa.func.now()
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=default))
+        if sqlite:
+            op.execute('UPDATE {} SET updated_at = CURRENT_TIMESTAMP'.format(table))
+        op.create_index('ix_{}_updated_at'.format(table), table, ['updated_at'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_{}_updated_at'.format(table), table_name=table)
+        op.drop_column(table, 'updated_at')
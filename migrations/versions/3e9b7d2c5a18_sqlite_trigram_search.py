@@ -0,0 +1,88 @@
+"""trigram search tables on SQLite
+
+Revision ID: 3e9b7d2c5a18
+Revises: d5a8c3f6e214
+Create Date: 2026-10-19 14:05:11.302846
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9b7d2c5a18'
+down_revision = 'd5a8c3f6e214'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+
+# 5b1e8f0c2a71 indexed name, city, state and genres with FTS5's default
+# tokenizer, which matches whole words and word prefixes, while Postgres
+# matches any substring of the search document. The tables now hold that
+# same document, lower-cased, under the trigram tokenizer (SQLite 3.34+), so
+# a quoted MATCH is a substring match as well. Genres are matched separately,
+# as on Postgres.
+
+# must stay identical to search.search_document()
+SEARCH_DOCUMENT = "lower(coalesce({0}.name, '') || ' ' || coalesce({0}.city, '') || ' ' || coalesce({0}.state, ''))"
+
+
+def _drop(table):
+    for trigger in ('ai', 'ad', 'au'):
+        op.execute('DROP TRIGGER IF EXISTS {}_fts_{}'.format(table, trigger))
+    op.execute('DROP TABLE IF EXISTS {}_fts'.format(table))
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        _drop(table)
+        op.execute("CREATE VIRTUAL TABLE {0}_fts USING fts5(document, tokenize='trigram')".format(table))
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ai AFTER INSERT ON {0} BEGIN "
+            "INSERT INTO {0}_fts(rowid, document) VALUES (new.id, {1}); END".format(
+                table, SEARCH_DOCUMENT.format('new'))
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ad AFTER DELETE ON {0} BEGIN "
+            "DELETE FROM {0}_fts WHERE rowid = old.id; END".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_au AFTER UPDATE ON {0} BEGIN "
+            "DELETE FROM {0}_fts WHERE rowid = old.id; "
+            "INSERT INTO {0}_fts(rowid, document) VALUES (new.id, {1}); END".format(
+                table, SEARCH_DOCUMENT.format('new'))
+        )
+        op.execute("INSERT INTO {0}_fts(rowid, document) SELECT id, {1} FROM {0}".format(
+            table, SEARCH_DOCUMENT.format(table)))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # back to the word-prefix tables of 5b1e8f0c2a71
+    for table in TABLES:
+        _drop(table)
+        op.execute(
+            "CREATE VIRTUAL TABLE {0}_fts USING fts5("
+            "name, city, state, genres, content='{0}', content_rowid='id')".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ai AFTER INSERT ON {0} BEGIN "
+            "INSERT INTO {0}_fts(rowid, name, city, state, genres) "
+            "VALUES (new.id, new.name, new.city, new.state, new.genres); END".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ad AFTER DELETE ON {0} BEGIN "
+            "INSERT INTO {0}_fts({0}_fts, rowid, name, city, state, genres) "
+            "VALUES ('delete', old.id, old.name, old.city, old.state, old.genres); END".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_au AFTER UPDATE ON {0} BEGIN "
+            "INSERT INTO {0}_fts({0}_fts, rowid, name, city, state, genres) "
+            "VALUES ('delete', old.id, old.name, old.city, old.state, old.genres); "
+            "INSERT INTO {0}_fts(rowid, name, city, state, genres) "
+            "VALUES (new.id, new.name, new.city, new.state, new.genres); END".format(table)
+        )
+        op.execute("INSERT INTO {0}_fts({0}_fts) VALUES ('rebuild')".format(table))
@@ -0,0 +1,102 @@
+"""search indexes for venues and artists
+
+Revision ID: 5b1e8f0c2a71
+Revises: c018bb4823f2
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e8f0c2a71'
+down_revision = 'c018bb4823f2'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+
+# must stay identical to search.search_document()
+SEARCH_DOCUMENT = "lower(coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, ''))"
+
+
+def _genres_is_array(table):
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    genres = next(c for c in columns if c['name'] == 'genres')
+    return isinstance(genres['type'], sa.ARRAY)
+
+
+def upgrade_postgresql():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in TABLES:
+        # the initial revision created genres as VARCHAR while the models
+        # declare ARRAY(String); line the column up so it can be GIN indexed.
+        # The stored values are array literals ({Jazz,"Rock n Roll"}), so a
+        # cast parses them, quoting and all.
+        if not _genres_is_array(table):
+            op.alter_column(
+                table, 'genres',
+                type_=postgresql.ARRAY(sa.String()),
+                postgresql_using='genres::text[]'
+            )
+        op.execute(
+            'CREATE INDEX ix_{0}_search_trgm ON {0} USING gin (({1}) gin_trgm_ops)'.format(table, SEARCH_DOCUMENT)
+        )
+        op.create_index('ix_{}_genres'.format(table), table, ['genres'], postgresql_using='gin')
+
+
+def downgrade_postgresql():
+    for table in TABLES:
+        op.drop_index('ix_{}_genres'.format(table), table_name=table)
+        op.drop_index('ix_{}_search_trgm'.format(table), table_name=table)
+
+
+def upgrade_sqlite():
+    for table in TABLES:
+        op.execute(
+            "CREATE VIRTUAL TABLE {0}_fts USING fts5("
+            "name, city, state, genres, content='{0}', content_rowid='id')".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ai AFTER INSERT ON {0} BEGIN "
+            "INSERT INTO {0}_fts(rowid, name, city, state, genres) "
+            "VALUES (new.id, new.name, new.city, new.state, new.genres); END".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_ad AFTER DELETE ON {0} BEGIN "
+            "INSERT INTO {0}_fts({0}_fts, rowid, name, city, state, genres) "
+            "VALUES ('delete', old.id, old.name, old.city, old.state, old.genres); END".format(table)
+        )
+        op.execute(
+            "CREATE TRIGGER {0}_fts_au AFTER UPDATE ON {0} BEGIN "
+            "INSERT INTO {0}_fts({0}_fts, rowid, name, city, state, genres) "
+            "VALUES ('delete', old.id, old.name, old.city, old.state, old.genres); "
+            "INSERT INTO {0}_fts(rowid, name, city, state, genres) "
+            "VALUES (new.id, new.name, new.city, new.state, new.genres); END".format(table)
+        )
+        op.execute("INSERT INTO {0}_fts({0}_fts) VALUES ('rebuild')".format(table))
+
+
+def downgrade_sqlite():
+    for table in TABLES:
+        for trigger in ('ai', 'ad', 'au'):
+            op.execute('DROP TRIGGER IF EXISTS {}_fts_{}'.format(table, trigger))
+        op.execute('DROP TABLE IF EXISTS {}_fts'.format(table))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        upgrade_postgresql()
+    elif dialect == 'sqlite':
+        upgrade_sqlite()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        downgrade_postgresql()
+    elif dialect == 'sqlite':
+        downgrade_sqlite()
@@ -0,0 +1,29 @@
+"""lower(name), city, state indexes for import deduplication
+
+Revision ID: 6f2a9c4d1b83
+Revises: 3e9b7d2c5a18
+Create Date: 2026-10-20 10:17:42.581094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2a9c4d1b83'
+down_revision = '3e9b7d2c5a18'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+
+
+def upgrade():
+    # importer.existing_named_keys() looks names up by lower(name)
+    for table in TABLES:
+        op.create_index('ix_{}_name_key'.format(table), table, [sa.text('lower(name)'), 'city', 'state'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_{}_name_key'.format(table), table_name=table)
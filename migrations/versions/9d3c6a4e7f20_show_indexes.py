@@ -0,0 +1,40 @@
+"""show indexes and cascading foreign keys
+
+Revision ID: 9d3c6a4e7f20
+Revises: 5b1e8f0c2a71
+Create Date: 2026-10-18 10:02:13.504417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3c6a4e7f20'
+down_revision = '5b1e8f0c2a71'
+branch_labels = None
+depends_on = None
+
+
+def _replace_foreign_keys(ondelete):
+    # the initial revision left these constraints unnamed, so they carry
+    # Postgres' default <table>_<column>_fkey names
+    for column, referent in (('venue_id', 'venues'), ('artist_id', 'artists')):
+        name = 'shows_{}_fkey'.format(column)
+        op.drop_constraint(name, 'shows', type_='foreignkey')
+        op.create_foreign_key(name, 'shows', referent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'])
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'])
+    op.create_index('ix_shows_start_time', 'shows', ['start_time'])
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_foreign_keys(None)
+    op.drop_index('ix_shows_start_time', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
@@ -0,0 +1,28 @@
+"""state/city indexes for venue and artist filters
+
+Revision ID: a4f1c7e2d953
+Revises: 7c2e5a9d4b16
+Create Date: 2026-10-18 20:41:07.226519
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c7e2d953'
+down_revision = '7c2e5a9d4b16'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+
+
+def upgrade():
+    # genre filters use the GIN indexes from 5b1e8f0c2a71
+    for table in TABLES:
+        op.create_index('ix_{}_state_city'.format(table), table, ['state', 'city'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index('ix_{}_state_city'.format(table), table_name=table)
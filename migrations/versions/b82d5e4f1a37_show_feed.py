@@ -0,0 +1,52 @@
+"""show_feed summary table for the upcoming shows feed
+
+Revision ID: b82d5e4f1a37
+Revises: a4f1c7e2d953
+Create Date: 2026-10-18 22:05:43.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b82d5e4f1a37'
+down_revision = 'a4f1c7e2d953'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('show_feed',
+    sa.Column('show_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('show_id')
+    )
+    op.create_index('ix_show_feed_start_time_show_id', 'show_feed', ['start_time', 'show_id'])
+    op.create_index('ix_show_feed_city_start_time_show_id', 'show_feed', ['city', 'start_time', 'show_id'])
+    op.create_index(op.f('ix_show_feed_venue_id'), 'show_feed', ['venue_id'])
+    op.create_index(op.f('ix_show_feed_artist_id'), 'show_feed', ['artist_id'])
+    # fill it once here; `flask feed refresh` keeps it current afterwards
+    op.execute(
+        'INSERT INTO show_feed (show_id, start_time, city, state, venue_id, venue_name, '
+        'artist_id, artist_name, artist_image_link) '
+        'SELECT shows.id, shows.start_time, venues.city, venues.state, venues.id, venues.name, '
+        'artists.id, artists.name, artists.image_link '
+        'FROM shows JOIN venues ON shows.venue_id = venues.id JOIN artists ON shows.artist_id = artists.id '
+        'WHERE shows.start_time >= CURRENT_DATE'
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_show_feed_artist_id'), table_name='show_feed')
+    op.drop_index(op.f('ix_show_feed_venue_id'), table_name='show_feed')
+    op.drop_index('ix_show_feed_city_start_time_show_id', table_name='show_feed')
+    op.drop_index('ix_show_feed_start_time_show_id', table_name='show_feed')
+    op.drop_table('show_feed')
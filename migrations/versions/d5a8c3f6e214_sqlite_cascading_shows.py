@@ -0,0 +1,46 @@
+"""cascading show foreign keys on SQLite
+
+Revision ID: d5a8c3f6e214
+Revises: b82d5e4f1a37
+Create Date: 2026-10-19 09:12:30.584117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8c3f6e214'
+down_revision = 'b82d5e4f1a37'
+branch_labels = None
+depends_on = None
+
+# 9d3c6a4e7f20 added ON DELETE CASCADE on Postgres only. SQLite cannot alter
+# a constraint, so the shows table is rebuilt with it; models.py turns
+# foreign key enforcement on for every SQLite connection.
+
+# names for the constraints the initial revision left unnamed
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _rebuild_foreign_keys(ondelete):
+    with op.batch_alter_table('shows', recreate='always', naming_convention=NAMING) as batch:
+        for column, referent in (('venue_id', 'venues'), ('artist_id', 'artists')):
+            name = 'fk_shows_{}_{}'.format(column, referent)
+            batch.drop_constraint(name, type_='foreignkey')
+            batch.create_foreign_key(name, referent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # shows left behind by venue and artist deletes while nothing cascaded
+    op.execute('DELETE FROM shows WHERE venue_id NOT IN (SELECT id FROM venues) '
+               'OR artist_id NOT IN (SELECT id FROM artists)')
+    op.execute('DELETE FROM show_feed WHERE show_id NOT IN (SELECT id FROM shows)')
+    _rebuild_foreign_keys('CASCADE')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_foreign_keys(None)
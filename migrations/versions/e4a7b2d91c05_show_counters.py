@@ -0,0 +1,35 @@
+"""denormalized show counters on venues and artists
+
+Revision ID: e4a7b2d91c05
+Revises: 9d3c6a4e7f20
+Create Date: 2026-10-18 11:26:51.730942
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7b2d91c05'
+down_revision = '9d3c6a4e7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, key in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        # the app compares start_time against local naive datetime.now()
+        op.execute(sa.text(
+            'UPDATE {0} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM shows WHERE shows.{1} = {0}.id AND shows.start_time >= :now), '
+            'past_shows_count = (SELECT count(*) FROM shows WHERE shows.{1} = {0}.id AND shows.start_time < :now)'.format(table, key)
+        ).bindparams(sa.bindparam('now', datetime.now(), type_=sa.DateTime())))
+
+
+def downgrade():
+    for table in ('venues', 'artists'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
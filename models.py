@@ -1,7 +1,24 @@
+import sqlite3
 from datetime import datetime
-from sqlalchemy import ARRAY, String
+from sqlalchemy import ARRAY, JSON, String, event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# genres are a Postgres text[]; SQLite (the test profile, benchmarks) keeps
+# the list as JSON text, which search and facets read with json_each()
+Genres = ARRAY(String).with_variant(JSON(none_as_null=True), 'sqlite')
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys unless asked per connection; the relationships
+    # below use passive_deletes, leaving a venue's or artist's shows to
+    # ON DELETE CASCADE
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -9,6 +26,10 @@ db = SQLAlchemy()
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        db.Index('ix_venues_state_city', 'state', 'city'),
+        db.Index('ix_venues_name_key', db.text('lower(name)'), 'city', 'state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String())
@@ -20,11 +41,15 @@ class Venue(db.Model):
     facebook_link = db.Column(db.String(120))
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(ARRAY(String))
+    genres = db.Column(Genres)
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='venue', lazy=True) 
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    # denormalized show counters, maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=db.func.now(), index=True)
     
     def __init__(self, name, city, state, address, phone, image_link, facebook_link, genres, website_link,seeking_talent=False, seeking_description=""):
         self.name = name
@@ -41,13 +66,17 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_state_city', 'state', 'city'),
+        db.Index('ix_artists_name_key', db.text('lower(name)'), 'city', 'state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String())
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(ARRAY(String), nullable=False)
+    genres = db.Column(Genres, nullable=False)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
@@ -55,7 +84,11 @@ class Artist(db.Model):
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='artist', lazy=True)
+    shows = db.relationship('Show', backref='artist', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    # denormalized show counters, maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=db.func.now(), index=True)
     
     def __init__(self, name, city, state, phone, image_link, facebook_link, genres, website_link,seeking_venue=False, seeking_description=""):
         self.name = name
@@ -72,10 +105,15 @@ class Artist(db.Model):
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=db.func.now(), index=True)
     
     def show_artist(self):
         return {
@@ -101,4 +139,40 @@ class Show(db.Model):
             'artist_name' :self.Artist.name,
             'artist_image_link' :self.Artist.image_link,
             'start_time' :self.start_time
-        }
\ No newline at end of file
+        }
+
+
+class ShowFeed(db.Model):
+    # upcoming shows with their venue and artist, for /shows; see feed.py
+    __tablename__ = 'show_feed'
+    __table_args__ = (
+        db.Index('ix_show_feed_start_time_show_id', 'start_time', 'show_id'),
+        db.Index('ix_show_feed_city_start_time_show_id', 'city', 'start_time', 'show_id'),
+    )
+    show_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    venue_id = db.Column(db.Integer, nullable=False, index=True)
+    venue_name = db.Column(db.String)
+    artist_id = db.Column(db.Integer, nullable=False, index=True)
+    artist_name = db.Column(db.String)
+    artist_image_link = db.Column(db.String(500))
+
+
+class Task(db.Model):
+    # deferred work for TASK_BACKEND=database; see tasks.py
+    __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', server_default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    max_attempts = db.Column(db.Integer, nullable=False, default=5, server_default='5')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=db.func.now())
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=db.func.now())
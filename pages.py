@@ -0,0 +1,31 @@
+from flask import request
+from cache import cache
+from facets import parse_filters, filtered
+from models import db, Show
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Shared by the venues, artists and shows blueprints: the cache names a write
+# has to evict, and the page names of the listings.
+
+def venue_cache_names(venue_id):
+  # a venue appears on its own page, the /venues area listing, the shows
+  # pages (and their show tiles) and the page of every artist that played there
+  shows = db.session.query(Show.id, Show.artist_id).filter(Show.venue_id == venue_id).all()
+  return ['venues', 'venue:{}'.format(venue_id)] + \
+    ['artist:{}'.format(a) for a in sorted({a for _, a in shows})] + ['show:{}'.format(s) for s, _ in shows]
+
+def artist_cache_names(artist_id):
+  shows = db.session.query(Show.id, Show.venue_id).filter(Show.artist_id == artist_id).all()
+  return ['artists', 'artist:{}'.format(artist_id)] + \
+    ['venue:{}'.format(v) for v in sorted({v for _, v in shows})] + ['show:{}'.format(s) for s, _ in shows]
+
+def evict_pages(*names):
+  cache.evict(*names)
+  cache.evict_prefix('shows')
+
+def listing_page_name(name):
+  # filtered listings skip the page cache, since writes only evict the plain names
+  return lambda: None if filtered(parse_filters(request.args)) else name
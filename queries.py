@@ -0,0 +1,294 @@
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from flask import current_app
+from sqlalchemy import select
+from facets import NO_FILTERS, facet_statement, facets_from_rows, filter_clauses
+from models import db, Venue, Artist, Show, ShowFeed
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+# Data builders shared by the HTML views and the JSON API. Each returns plain
+# dicts/lists so the result can be cached, rendered or serialized as is. The
+# statements and the row shaping are kept apart (*_statement, *_from_rows) so
+# the async read path in asgi.py runs exactly the same SQL.
+
+
+def encode_show_cursor(start_time, show_id):
+    return '{}_{}'.format(start_time.strftime('%Y%m%dT%H%M%S%f'), show_id)
+
+
+def decode_show_cursor(cursor):
+    # returns a (start_time, id) keyset tuple, or None for a missing/garbled cursor
+    if not cursor:
+        return None
+    try:
+        start_time, show_id = cursor.split('_', 1)
+        return datetime.strptime(start_time, '%Y%m%dT%H%M%S%f'), int(show_id)
+    except ValueError:
+        return None
+
+
+def _dialect(dialect):
+    return dialect or db.session.get_bind().dialect.name
+
+
+def venue_areas_statement(filters=NO_FILTERS, dialect=None):
+    # num_upcoming_shows is the venue's denormalized counter (see counters.py),
+    # so this is a plain ordered scan of venues grouped into areas in one pass.
+    return select(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_shows_count)\
+        .where(*filter_clauses(Venue, filters, _dialect(dialect)))\
+        .order_by(Venue.city, Venue.state, Venue.name)
+
+
+def venue_areas_from_rows(rows):
+    data = []
+    for (city, state), group in groupby(rows, key=itemgetter(0, 1)):
+        data.append({
+            "city": city,
+            "state": state,
+            "venues": [
+                {"id": venue_id, "name": venue_name, "num_upcoming_shows": count}
+                for _, _, venue_id, venue_name, count in group
+            ]
+        })
+    return data
+
+
+def venue_listing(filters=NO_FILTERS):
+    # the /venues page: areas and facet counts, two statements
+    dialect = _dialect(None)
+    return {
+        "areas": venue_areas_from_rows(db.session.execute(venue_areas_statement(filters, dialect))),
+        "facets": facets_from_rows(db.session.execute(facet_statement(Venue, filters, dialect))),
+    }
+
+
+def artist_show(start_time, artist_id, artist_name, artist_image_link):
+    return {
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def venue_data(venue, past_shows, upcoming_shows):
+    # venue is a Venue or a row with the same column names
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows": upcoming_shows,
+        "upcoming_shows_count": len(upcoming_shows)
+    }
+
+
+def venue_shows_statement(venue_id, upcoming, now):
+    # one side (past or upcoming) of a venue's shows, for the async path
+    when = Show.start_time >= now if upcoming else Show.start_time < now
+    return select(Show.start_time, Artist.id, Artist.name, Artist.image_link)\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .where(Show.venue_id == venue_id, when)\
+        .order_by(Show.start_time)
+
+
+def venue_detail(venue_id):
+    # data for the venue page with the given venue_id, or None if it is missing.
+    # The venue, its shows and their artists come back in one outer-joined
+    # query; shows are split into past and upcoming here.
+    rows = db.session.query(Venue, Show.start_time, Artist.id, Artist.name, Artist.image_link)\
+        .outerjoin(Show, Show.venue_id == Venue.id)\
+        .outerjoin(Artist, Show.artist_id == Artist.id)\
+        .filter(Venue.id == venue_id)\
+        .order_by(Show.start_time)\
+        .all()
+    if not rows:
+        return None
+
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    for _, start_time, artist_id, artist_name, artist_image_link in rows:
+        if start_time is None:
+            continue
+        show = artist_show(start_time, artist_id, artist_name, artist_image_link)
+        (upcoming_shows if start_time >= now else past_shows).append(show)
+    return venue_data(rows[0][0], past_shows, upcoming_shows)
+
+
+def artist_list_statement(filters=NO_FILTERS, dialect=None):
+    return select(Artist.id, Artist.name)\
+        .where(*filter_clauses(Artist, filters, _dialect(dialect)))\
+        .order_by(Artist.name)
+
+
+def artist_list_from_rows(rows):
+    return [{"id": artist_id, "name": name} for artist_id, name in rows]
+
+
+def artist_listing(filters=NO_FILTERS):
+    # the /artists page: artists and facet counts, two statements
+    dialect = _dialect(None)
+    return {
+        "artists": artist_list_from_rows(db.session.execute(artist_list_statement(filters, dialect))),
+        "facets": facets_from_rows(db.session.execute(facet_statement(Artist, filters, dialect))),
+    }
+
+
+def venue_show(start_time, venue_id, venue_name, venue_image_link):
+    return {
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "venue_image_link": venue_image_link,
+        "start_time": start_time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def artist_data(artist, past_shows, upcoming_shows):
+    # artist is an Artist or a row with the same column names
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows": upcoming_shows,
+        "upcoming_shows_count": len(upcoming_shows)
+    }
+
+
+def artist_shows_statement(artist_id, upcoming, now):
+    when = Show.start_time >= now if upcoming else Show.start_time < now
+    return select(Show.start_time, Venue.id, Venue.name, Venue.image_link)\
+        .join(Venue, Show.venue_id == Venue.id)\
+        .where(Show.artist_id == artist_id, when)\
+        .order_by(Show.start_time)
+
+
+def artist_detail(artist_id):
+    # data for the artist page with the given artist_id, or None if it is missing.
+    # Same single outer-joined query as venue_detail, from the artist side.
+    rows = db.session.query(Artist, Show.start_time, Venue.id, Venue.name, Venue.image_link)\
+        .outerjoin(Show, Show.artist_id == Artist.id)\
+        .outerjoin(Venue, Show.venue_id == Venue.id)\
+        .filter(Artist.id == artist_id)\
+        .order_by(Show.start_time)\
+        .all()
+    if not rows:
+        return None
+
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    for _, start_time, venue_id, venue_name, venue_image_link in rows:
+        if start_time is None:
+            continue
+        show = venue_show(start_time, venue_id, venue_name, venue_image_link)
+        (upcoming_shows if start_time >= now else past_shows).append(show)
+    return artist_data(rows[0][0], past_shows, upcoming_shows)
+
+
+def parse_show_range(values):
+    """(start, end, city) for /shows from ?from=, ?to= and ?city=.
+
+    from and to are YYYY-MM-DD days, both included; from defaults to today
+    and to to no end. Raises ValueError for a malformed or backwards range.
+    """
+    first = date.fromisoformat(values.get('from') or date.today().isoformat())
+    start = datetime.combine(first, datetime.min.time())
+    end = None
+    if values.get('to'):
+        last = date.fromisoformat(values['to'])
+        if last < first:
+            raise ValueError('to is before from')
+        end = datetime.combine(last + timedelta(days=1), datetime.min.time())
+    return start, end, (values.get('city') or '').strip() or None
+
+
+def show_page_statement(after, before, per_page, start, end=None, city=None):
+    # one keyset page of the upcoming shows feed (see feed.py) for /shows, plus
+    # one row to tell if there is more. Pages are ordered on (start_time, id);
+    # ?after=<cursor> moves forward and ?before=<cursor> moves back, within
+    # [start, end) and the city, so each page is one index range read.
+    after = decode_show_cursor(after)
+    before = decode_show_cursor(before)
+
+    statement = select(
+        ShowFeed.show_id, ShowFeed.start_time,
+        ShowFeed.venue_id, ShowFeed.venue_name,
+        ShowFeed.artist_id, ShowFeed.artist_name, ShowFeed.artist_image_link
+    ).where(ShowFeed.start_time >= start)
+    if end is not None:
+        statement = statement.where(ShowFeed.start_time < end)
+    if city is not None:
+        statement = statement.where(ShowFeed.city == city)
+    key = db.tuple_(ShowFeed.start_time, ShowFeed.show_id)
+    if before:
+        statement = statement.where(key < db.tuple_(*before))\
+            .order_by(ShowFeed.start_time.desc(), ShowFeed.show_id.desc())
+    else:
+        if after:
+            statement = statement.where(key > db.tuple_(*after))
+        statement = statement.order_by(ShowFeed.start_time, ShowFeed.show_id)
+    return statement.limit(per_page + 1)
+
+
+def show_page_from_rows(rows, after, before, per_page):
+    after = decode_show_cursor(after)
+    before = decode_show_cursor(before)
+    rows = list(rows)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before:
+        rows.reverse()
+
+    data = []
+    for show_id, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in rows:
+        data.append({
+            "id": show_id,
+            "venue_id": venue_id,
+            "venue_name": venue_name,
+            "artist_id": artist_id,
+            "artist_name": artist_name,
+            "artist_image_link": artist_image_link,
+            "start_time": start_time
+        })
+
+    prev_cursor = next_cursor = None
+    if rows:
+        # walking backwards, the extra row means there is an earlier page and we
+        # know a later one exists; walking forwards it is the other way round.
+        if has_more if before else after:
+            prev_cursor = encode_show_cursor(rows[0][1], rows[0][0])
+        if before or has_more:
+            next_cursor = encode_show_cursor(rows[-1][1], rows[-1][0])
+
+    return {"shows": data, "prev_cursor": prev_cursor, "next_cursor": next_cursor}
+
+
+def show_page(after, before, start, end=None, city=None):
+    per_page = current_app.config['SHOWS_PER_PAGE']
+    rows = db.session.execute(show_page_statement(after, before, per_page, start, end, city))
+    return show_page_from_rows(rows, after, before, per_page)
@@ -0,0 +1,114 @@
+import itertools
+import logging
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# DATABASE_REPLICA_URL lists one or more replicas, bound as 'replica_1',
+# 'replica_2', ... SELECTs run by read-only views (GET/HEAD requests, and
+# POST views marked @read_only, like search) go to a replica:
+#   - each request picks one replica, round-robin, and reads only from it;
+#   - a replica whose connection check fails is skipped for
+#     REPLICA_RETRY_SECONDS and the next one (finally the primary) is used;
+#   - once the session has written, the rest of the request stays on the
+#     primary, and a commit pins the client to the primary for
+#     REPLICA_STICKY_SECONDS so it reads its own writes despite replica lag.
+# Flushes, other statements and everything outside a request use the primary.
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+logger = logging.getLogger('fyyur.routing')
+
+
+def replica_keys(engines):
+    return sorted(key for key in engines if key and key.startswith(REPLICA_BIND))
+
+
+def read_only(view):
+    """Let a non-GET view that never writes read from the replicas."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g._read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class Replicas(object):
+    # per-process round-robin position and the replicas currently skipped
+
+    def __init__(self):
+        self._turn = itertools.count()
+        self._down = {}
+
+    def candidates(self, keys):
+        if not keys:
+            return []
+        start = next(self._turn) % len(keys)
+        now = time.monotonic()
+        return [key for key in keys[start:] + keys[:start] if self._down.get(key, 0) <= now]
+
+    def mark_down(self, key, seconds):
+        self._down[key] = time.monotonic() + seconds
+
+    def mark_up(self, key):
+        self._down.pop(key, None)
+
+
+replicas = Replicas()
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            engine = self._replica()
+            if engine is not None:
+                return engine
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        return super(RoutingSession, self).get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if self._flushing or self.info.get('wrote') or not getattr(clause, 'is_select', False):
+            return False
+        if not has_request_context():
+            return False
+        if request.method not in READ_METHODS and not g.get('_read_only'):
+            return False
+        return client_session.get('_primary_until', 0) <= time.time()
+
+    def _replica(self):
+        # None means read from the primary
+        if 'replica' in self.info:
+            key = self.info['replica']
+            return None if key is None else self._db.engines[key]
+        key = None
+        for candidate in replicas.candidates(replica_keys(self._db.engines)):
+            try:
+                # a pooled checkout (with pre_ping on Postgres) is the health check
+                self._db.engines[candidate].connect().close()
+            except DBAPIError as e:
+                replicas.mark_down(candidate, current_app.config.get('REPLICA_RETRY_SECONDS', 30))
+                logger.warning('Replica %s unavailable, skipping it: %s', candidate, e)
+                continue
+            replicas.mark_up(candidate)
+            key = candidate
+            break
+        self.info['replica'] = key
+        return None if key is None else self._db.engines[key]
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def stick_to_primary(session):
+    if session.info.get('wrote') and has_request_context():
+        window = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        if window:
+            client_session['_primary_until'] = time.time() + window
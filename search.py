@@ -0,0 +1,128 @@
+from flask import current_app, request
+from sqlalchemy import literal, literal_column, select, text
+from sqlalchemy.dialects import postgresql
+from facets import GENRES, NO_FILTERS, facet_statement, facets_from_rows, filter_clauses
+from models import db
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# On Postgres, name/city/state are matched through a pg_trgm GIN index over
+# the lower-cased search document and genres through a GIN index on the array
+# column. On SQLite the search document is kept, by triggers, in an FTS5
+# table with the trigram tokenizer (migration 3e9b7d2c5a18), whose quoted
+# MATCH is the same substring match; terms shorter than a trigram fall back
+# to LIKE, and genres go through json_each(). Either way a term matches the
+# same rows on both backends. Results can be narrowed, and are counted by
+# genre and city, as in facets.py.
+
+
+def search_document(model):
+    # must stay identical to the expression indexed in the migration
+    empty, space = literal_column("''"), literal_column("' '")
+    return db.func.lower(
+        db.func.coalesce(model.name, empty) + space +
+        db.func.coalesce(model.city, empty) + space +
+        db.func.coalesce(model.state, empty)
+    )
+
+
+def _like_pattern(term):
+    escaped = term.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%' + escaped + '%'
+
+
+# the trigram tokenizer cannot match anything shorter
+TRIGRAM = 3
+
+
+def _fts_query(term):
+    # the whole term as one phrase, i.e. a substring of the document
+    return '"{}"'.format(term.lower().replace('"', '""'))
+
+
+def _postgres_hits(model, term):
+    clause = search_document(model).like(_like_pattern(term), escape='\\')
+    genre = GENRES.get(term.lower())
+    if genre:
+        # models use the generic ARRAY type, so spell out @> for the GIN index
+        clause = db.or_(clause, model.genres.op('@>')(postgresql.array([genre])))
+    rank = db.func.similarity(model.name, term)
+    return select(model.id.label('id'), rank.label('rank')).where(clause)
+
+
+def _sqlite_hits(model, term):
+    genre = GENRES.get(term.lower())
+    if len(term) < TRIGRAM:
+        clause = search_document(model).like(_like_pattern(term), escape='\\')
+        if genre:
+            clause = db.or_(clause, _sqlite_genre(model, genre))
+        return select(model.id.label('id'), literal(0).label('rank')).where(clause)
+    fts = model.__tablename__ + '_fts'
+    # bm25() is lower-is-better, negate it so both backends rank descending
+    matches = select(
+        literal_column('rowid').label('id'),
+        literal_column('-bm25({})'.format(fts)).label('rank')
+    ).select_from(text(fts)).where(
+        text('{} MATCH :fts_query'.format(fts)).bindparams(fts_query=_fts_query(term))
+    )
+    if not genre:
+        return matches
+    matches = matches.subquery()
+    return select(model.id.label('id'), db.func.coalesce(matches.c.rank, 0).label('rank'))\
+        .outerjoin(matches, matches.c.id == model.id)\
+        .where(db.or_(matches.c.id.isnot(None), _sqlite_genre(model, genre)))
+
+
+def _sqlite_genre(model, genre):
+    return filter_clauses(model, dict(NO_FILTERS, genres=[genre]), 'sqlite')[0]
+
+
+def search_hits(model, term, dialect=None):
+    """Subquery of (id, rank) for rows of model matching term, best first."""
+    term = (term or '').strip()
+    dialect = dialect or db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        hits = _sqlite_hits(model, term)
+    else:
+        hits = _postgres_hits(model, term)
+    return hits.subquery()
+
+
+def search_statements(model, term, limit, offset=0, dialect=None, filters=NO_FILTERS):
+    """(page, count, facets) statements for a search; see search()."""
+    dialect = dialect or db.session.get_bind().dialect.name
+    hits = search_hits(model, term, dialect)
+    clauses = filter_clauses(model, filters, dialect)
+    rows = select(model.id, model.name, model.upcoming_shows_count.label('num_upcoming_shows'))\
+        .join(hits, hits.c.id == model.id)\
+        .where(*clauses)\
+        .order_by(hits.c.rank.desc(), model.name, model.id)\
+        .offset(offset)\
+        .limit(limit)
+    if clauses:
+        count = select(db.func.count()).select_from(model).join(hits, hits.c.id == model.id).where(*clauses)
+    else:
+        count = select(db.func.count()).select_from(hits)
+    return rows, count, facet_statement(model, filters, dialect, hits)
+
+
+def search(model, term, limit, offset=0, filters=NO_FILTERS):
+    """One page of (id, name, num_upcoming_shows) rows, the total match count
+    and the facet counts of all matches.
+
+    num_upcoming_shows is the denormalized counter kept by counters.py, so a
+    page costs three statements however many rows match.
+    """
+    rows, count, facets = search_statements(model, term, limit, offset, filters=filters)
+    return db.session.execute(rows).all(), db.session.execute(count).scalar(), \
+        facets_from_rows(db.session.execute(facets))
+
+
+def search_page():
+    # ?page=&per_page= on the search endpoints; per_page is capped so a single
+    # request cannot ask for the whole table.
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = request.args.get('per_page', current_app.config['SEARCH_RESULTS_PER_PAGE'], type=int)
+    return page, min(max(per_page, 1), current_app.config['SEARCH_MAX_PER_PAGE'])
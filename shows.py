@@ -0,0 +1,90 @@
+from flask import Blueprint, render_template, request, flash, abort
+from models import db
+from cache import cache
+from booking import book_shows
+from queries import show_page, parse_show_range
+from pages import evict_pages
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+# The upcoming shows pages, read from the feed table (see feed.py), and the
+# booking form; form classes are imported in the views, as in venues.py.
+
+blueprint = Blueprint('shows', __name__)
+
+SHOW_RANGE_ARGS = ('from', 'to', 'city')
+
+def show_range_args():
+  # the ?from=&to=&city= range of a /shows request, for its pager links
+  return {key: request.args[key] for key in SHOW_RANGE_ARGS if request.args.get(key)}
+
+def show_page_name():
+  return 'shows?after={}&before={}&from={}&to={}&city={}'.format(
+    *[request.args.get(key, '') for key in ('after', 'before') + SHOW_RANGE_ARGS])
+
+def show_range():
+  try:
+    return parse_show_range(request.args)
+  except ValueError:
+    abort(400)
+
+@blueprint.route('/shows')
+@cache.cached_page(show_page_name)
+def shows():
+  # displays upcoming shows at /shows, read from the feed table (see feed.py)
+  after, before = request.args.get('after'), request.args.get('before')
+  start, end, city = show_range()
+  page = cache.data(show_page_name(), lambda: show_page(after, before, start, end, city))
+  return render_template('pages/shows.html', range_args=show_range_args(), **page)
+
+@blueprint.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+  from forms import ShowForm
+  form = ShowForm(request.form)
+  error = False
+  if request.method == "POST" and form.validate():
+    problems = {}
+    try:
+      # checks both ids and both calendars in one query before inserting
+      shows, problems = book_shows([(form.venue_id.data, form.artist_id.data, form.start_time.data)])
+      if problems:
+        db.session.rollback()
+      else:
+        db.session.commit()
+    except Exception:
+      error = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if problems:
+      for field, messages in problems[0].items():
+        getattr(form, field).errors.extend(messages)
+      flash(form.errors)
+      return render_template('forms/new_show.html', form=form)
+    if not error:
+      # on successful db insert, flash success
+      evict_pages('venues', 'venue:{}'.format(form.venue_id.data), 'artist:{}'.format(form.artist_id.data))
+      flash('Show was successfully listed!')
+      # return redirect(url_for("index"))
+      return render_template('pages/home.html')
+    else:
+      flash('An error occurred. Show could not be listed.')
+      # abort(400)
+  else:
+    flash(form.errors)
+    return render_template('forms/new_show.html', form=form)
+
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Show could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
@@ -2,3 +2,35 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Name suggestions for inputs marked data-autocomplete="venues|artists",
+// filled into the <datalist> named by their list attribute. With
+// data-autocomplete-value="id" the suggestion's value is the id and the
+// name is its label (the show form's id fields).
+document.querySelectorAll('[data-autocomplete]').forEach(function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var byId = input.getAttribute('data-autocomplete-value') === 'id';
+  var timer = null;
+  input.addEventListener('input', function () {
+    var q = input.value.trim();
+    clearTimeout(timer);
+    if (!q || (byId && /^\d+$/.test(q))) {
+      return;
+    }
+    timer = setTimeout(function () {
+      fetch('/api/v1/autocomplete/' + input.getAttribute('data-autocomplete') + '?q=' + encodeURIComponent(q))
+        .then(function (response) { return response.json(); })
+        .then(function (body) {
+          list.innerHTML = '';
+          body.data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = byId ? item.id : item.name;
+            if (byId) {
+              option.label = item.name;
+            }
+            list.appendChild(option);
+          });
+        });
+    }, 100);
+  });
+});
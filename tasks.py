@@ -0,0 +1,256 @@
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+from cache import cache
+from counters import recompute
+from models import db, Venue, Artist, Show, Task
+
+#----------------------------------------------------------------------------#
+# Deferred tasks.
+#----------------------------------------------------------------------------#
+
+# Write handlers hand slow side-effects to `some_task.delay(...)` and return.
+# A task joins the current transaction: it is dispatched only if that
+# transaction commits, so call delay() before db.session.commit(). Arguments
+# must be JSON-serializable. TASK_BACKEND picks how tasks run:
+#   'thread'    a per-process thread pool, after the commit (development)
+#   'database'  a row in the tasks table, committed with the write and run by
+#               `flask tasks worker`; workers claim rows with
+#               SELECT ... FOR UPDATE SKIP LOCKED, so any number can run.
+#               Tasks evict cache entries once their writes commit, which
+#               only reaches the web workers through a shared cache, so this
+#               backend needs CACHE_BACKEND 'redis' (or 'null')
+#   'eager'     inline at commit time (tests)
+# A failing task is retried up to TASK_MAX_ATTEMPTS times, waiting
+# TASK_RETRY_DELAY * 2**(attempt - 1) seconds between attempts.
+
+logger = logging.getLogger('fyyur.tasks')
+
+REGISTRY = {}
+
+
+class TaskFunction(object):
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.name = fn.__name__
+        REGISTRY[self.name] = self
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        current_app.extensions['tasks'].enqueue(self.name, args, kwargs)
+
+
+def task(fn):
+    """Register fn as a task; call fn.delay(...) to defer it."""
+    return TaskFunction(fn)
+
+
+def retry_delay(attempts):
+    return current_app.config.get('TASK_RETRY_DELAY', 10) * 2 ** (attempts - 1)
+
+
+def run_task(name, payload):
+    # the task's own writes commit here; on failure nothing it did is kept
+    try:
+        REGISTRY[name](*payload['args'], **payload['kwargs'])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+class TaskQueue(object):
+
+    def __init__(self, app=None):
+        self.backend = 'thread'
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = app.config.get('TASK_BACKEND', 'thread')
+        if self.backend not in ('thread', 'database', 'eager'):
+            raise ValueError('Unknown TASK_BACKEND {!r}'.format(self.backend))
+        if self.backend == 'database' and not app.extensions['cache'].shared:
+            raise ValueError("TASK_BACKEND 'database' needs a cache shared with the worker processes; "
+                             "CACHE_BACKEND {!r} is per process".format(app.config.get('CACHE_BACKEND')))
+        if self.backend == 'thread':
+            self._executor = ThreadPoolExecutor(app.config.get('TASK_THREADS', 4), thread_name_prefix='task')
+        app.extensions['tasks'] = self
+
+    def enqueue(self, name, args, kwargs):
+        if name not in REGISTRY:
+            raise KeyError('Unknown task {!r}'.format(name))
+        payload = json.dumps({"args": list(args), "kwargs": kwargs})
+        if self.backend == 'database':
+            db.session.add(Task(
+                name=name,
+                payload=payload,
+                max_attempts=current_app.config.get('TASK_MAX_ATTEMPTS', 5),
+            ))
+        else:
+            app = current_app._get_current_object()
+            db.session.info.setdefault('pending_tasks', []).append((app, name, payload))
+
+    def dispatch(self, pending):
+        for app, name, payload in pending:
+            if self.backend == 'eager':
+                self.run_with_retries(app, name, payload, sleep=False)
+            else:
+                self._executor.submit(self.run_with_retries, app, name, payload)
+
+    def run_with_retries(self, app, name, payload, sleep=True):
+        with app.app_context():
+            attempts = app.config.get('TASK_MAX_ATTEMPTS', 5)
+            for attempt in range(1, attempts + 1):
+                try:
+                    run_task(name, json.loads(payload))
+                    return
+                except Exception:
+                    logger.exception('Task %s failed (attempt %d of %d)', name, attempt, attempts)
+                    if sleep and attempt < attempts:
+                        time.sleep(retry_delay(attempt))
+
+
+tasks = TaskQueue()
+
+
+@event.listens_for(Session, 'after_commit')
+def dispatch_pending(session):
+    pending = session.info.pop('pending_tasks', None)
+    if pending:
+        pending[0][0].extensions['tasks'].dispatch(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_pending(session):
+    session.info.pop('pending_tasks', None)
+
+
+#----------------------------------------------------------------------------#
+# Database worker.
+#----------------------------------------------------------------------------#
+
+def claim(limit):
+    """Lock up to limit runnable tasks for this worker; returns (id, name, payload)."""
+    now = datetime.utcnow()
+    # a 'running' task whose worker died is claimed again once its lock expires
+    stale = now - timedelta(seconds=current_app.config.get('TASK_LOCK_TIMEOUT', 300))
+    rows = db.session.query(Task)\
+        .filter(or_(
+            and_(Task.status == 'queued', Task.run_at <= now),
+            and_(Task.status == 'running', Task.locked_at < stale)
+        ))\
+        .order_by(Task.run_at, Task.id)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)\
+        .all()
+    claimed = []
+    for row in rows:
+        row.status = 'running'
+        row.locked_at = now
+        row.attempts += 1
+        claimed.append((row.id, row.name, row.payload))
+    db.session.commit()
+    return claimed
+
+
+def work(task_id, name, payload):
+    try:
+        run_task(name, json.loads(payload))
+    except Exception:
+        logger.exception('Task %s #%d failed', name, task_id)
+        row = db.session.get(Task, task_id)
+        row.last_error = traceback.format_exc(limit=5)
+        if row.attempts >= row.max_attempts:
+            row.status = 'failed'
+        else:
+            row.status = 'queued'
+            row.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(row.attempts))
+        row.locked_at = None
+        db.session.commit()
+        return False
+    db.session.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+    db.session.commit()
+    return True
+
+
+tasks_cli = AppGroup('tasks', help='Run and inspect deferred tasks.')
+
+
+@tasks_cli.command('worker')
+@click.option('--batch', default=10, show_default=True, help='Tasks claimed per round trip.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to sleep when idle.')
+@click.option('--once', is_flag=True, help='Exit once no task is runnable.')
+def worker_command(batch, poll_interval, once):
+    """Run queued tasks from the tasks table (TASK_BACKEND=database)."""
+    done = failed = 0
+    while True:
+        claimed = claim(batch)
+        if not claimed:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        for task_id, name, payload in claimed:
+            if work(task_id, name, payload):
+                done += 1
+            else:
+                failed += 1
+    click.echo('{} tasks done, {} failed attempts.'.format(done, failed))
+
+
+@tasks_cli.command('status')
+def status_command():
+    counts = db.session.query(Task.status, db.func.count(Task.id)).group_by(Task.status).all()
+    for status, count in sorted(counts):
+        click.echo('{:<8} {}'.format(status, count))
+    if not counts:
+        click.echo('No tasks.')
+
+
+@tasks_cli.command('retry')
+def retry_command():
+    """Queue every failed task again."""
+    count = db.session.query(Task).filter(Task.status == 'failed').update({
+        Task.status: 'queued', Task.attempts: 0, Task.run_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    click.echo('Requeued {} tasks.'.format(count))
+
+
+#----------------------------------------------------------------------------#
+# Tasks.
+#----------------------------------------------------------------------------#
+
+@task
+def recount_artists(artist_ids):
+    # after a venue delete cascades away its shows
+    recompute(Artist, artist_ids)
+    db.session.flush()
+    cache.evict('artists', *['artist:{}'.format(a) for a in artist_ids])
+
+
+@task
+def announce_show(show_id):
+    # the delivery hook for telling an artist about a new booking; for now
+    # the announcement is logged
+    row = db.session.query(Show.start_time, Venue.name, Artist.name)\
+        .join(Venue, Show.venue_id == Venue.id)\
+        .join(Artist, Show.artist_id == Artist.id)\
+        .filter(Show.id == show_id)\
+        .one_or_none()
+    if row is not None:
+        start_time, venue_name, artist_name = row
+        logger.info('New show for %s at %s on %s', artist_name, venue_name, start_time)
@@ -0,0 +1,135 @@
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+import click
+from flask import current_app, g, before_render_template, template_rendered
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from cache import cache
+
+#----------------------------------------------------------------------------#
+# Templates.
+#----------------------------------------------------------------------------#
+
+# Compiled templates are kept in a Jinja bytecode cache on disk, so a fresh
+# worker loads them instead of parsing and compiling each one on first use;
+# `flask templates compile` fills it ahead of time. Repeated tiles are cached
+# as rendered fragments:
+#
+#     {% cache 'venue:' ~ venue.id %} ... {% endcache %}
+#     {% cache 'show:' ~ show.id, 300 %} ... {% endcache %}
+#
+# A fragment is stored under 'fragment:<name>' in the page/data cache, so
+# evicting a name (cache.evict('venue:12')) drops it with the pages. The
+# optional second argument is a TTL in seconds (default CACHE_DEFAULT_TTL).
+#
+# The `datetime` filter formats show times with babel. babel (and its locale
+# data) and dateutil are imported on the first call, not at startup.
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    # compiled babel pattern and locale, parsed once per (format, locale)
+    from babel import Locale
+    from babel.dates import parse_pattern
+    return parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale)
+
+
+@lru_cache(maxsize=4096)
+def cached_format_datetime(value, format, locale):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            import dateutil.parser
+            value = dateutil.parser.parse(value)
+    pattern, locale = datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium'):
+    # accepts datetimes or date strings; repeated values (the same show time on
+    # several tiles, the same page re-rendered) come from the LRU above
+    return cached_format_datetime(value, format, 'en')
+
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cached', args), [], [], body).set_lineno(lineno)
+
+    def _cached(self, name, ttl, caller):
+        key = 'fragment:{}'.format(name)
+        # rendered output is Markup, which stays unescaped when it comes back
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, value, ttl)
+        return value
+
+
+class Templating(object):
+
+    def __init__(self, app=None):
+        self.log_ms = 50
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.filters['datetime'] = format_datetime
+        if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+            directory = app.config.get('TEMPLATE_CACHE_DIR')
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # None means a per-user directory under the system temp dir
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        self.log_ms = app.config.get('TEMPLATE_RENDER_LOG_MS', 50)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        app.cli.add_command(templates_cli)
+        app.extensions['templating'] = self
+
+    def start_render(self, app, template, context, **extra):
+        g.setdefault('_render_log', []).append(time.perf_counter())
+
+    def finish_render(self, app, template, context, **extra):
+        started = g.get('_render_log')
+        if started:
+            ms = (time.perf_counter() - started.pop()) * 1000
+            level = 'info' if ms >= self.log_ms else 'debug'
+            getattr(app.logger, level)('Rendered %s in %.1f ms', template.name, ms)
+
+
+templating = Templating()
+
+
+templates_cli = AppGroup('templates', help='Manage compiled templates.')
+
+
+@templates_cli.command('compile')
+def compile_command():
+    """Compile every template into the bytecode cache."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.ClickException('TEMPLATE_BYTECODE_CACHE is off.')
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    click.echo('Compiled {} templates into {}.'.format(len(names), env.bytecode_cache.directory))
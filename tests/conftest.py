@@ -0,0 +1,146 @@
+"""App fixtures for the test suite.
+
+Each test gets its own app on a fresh SQLite file, copied from one migrated
+once per session, so the schema is exactly what `flask db upgrade` builds
+(FTS tables and cascading foreign keys included) and tests cannot see each
+other's rows.
+"""
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('FYYUR_ENV', 'test')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, init_migrations  # noqa: E402
+from config import TestConfig  # noqa: E402
+from models import db, Venue, Artist, Show  # noqa: E402
+
+
+def make_app(uri, **settings):
+    """create_app() on the test profile with uri as the primary database."""
+    attributes = dict(
+        SQLALCHEMY_DATABASE_URI=uri,
+        SQLALCHEMY_ENGINE_OPTIONS={},
+        SQLALCHEMY_BINDS={},
+        TEMPLATE_BYTECODE_CACHE=False,
+        SQL_SLOW_LOG=None)
+    attributes.update(settings)
+    return create_app(type('Config', (TestConfig,), attributes))
+
+
+def migrate(uri):
+    from flask_migrate import upgrade
+    app = make_app(uri)
+    init_migrations(app)
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def migrated(tmp_path_factory):
+    # a database file at the migrations' head, copied by each test
+    database = str(tmp_path_factory.mktemp('schema') / 'fyyur.db')
+    migrate('sqlite:///' + database)
+    return database
+
+
+@pytest.fixture
+def database(migrated, tmp_path):
+    path = str(tmp_path / 'fyyur.db')
+    shutil.copy(migrated, path)
+    return path
+
+
+@pytest.fixture
+def app(database):
+    app = make_app('sqlite:///' + database)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class StatementCounter(object):
+    # statements run on the app's primary engine since the last reset()
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.reset()
+        event.listen(engine, 'after_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, *args):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def reset(self):
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def close(self):
+        event.remove(self.engine, 'after_cursor_execute', self._record)
+
+
+@pytest.fixture
+def statements(app):
+    counter = StatementCounter(db.engine)
+    yield counter
+    counter.close()
+
+
+@pytest.fixture
+def seed(app):
+    """seed(venues, artists, shows_per_venue) adds rows and returns the venues.
+
+    Each venue gets half its shows in the past and half upcoming, and the
+    show counters and upcoming shows feed are rebuilt as the importer does.
+    """
+    from counters import recompute
+    from feed import refresh
+
+    def seed(venues=3, artists=3, shows_per_venue=2, city='San Francisco'):
+        start = db.session.query(db.func.count(Venue.id)).scalar()
+        added_venues = [
+            Venue('Venue {}'.format(start + i), city, 'CA', '{} Main St'.format(i), '5550000000',
+                  'https://example.com/v{}.jpg'.format(i), '', ['Jazz', 'Folk'], '')
+            for i in range(venues)
+        ]
+        added_artists = [
+            Artist('Artist {}'.format(start + i), city, 'CA', '5550000000',
+                   'https://example.com/a{}.jpg'.format(i), '', ['Jazz'], '')
+            for i in range(artists)
+        ]
+        db.session.add_all(added_venues + added_artists)
+        db.session.flush()
+        now = datetime.now()
+        for v, venue in enumerate(added_venues):
+            for s in range(shows_per_venue):
+                days = (s + 1) * 7 if s % 2 else -(s + 1) * 7
+                db.session.add(Show(venue_id=venue.id,
+                                    artist_id=added_artists[(v + s) % len(added_artists)].id,
+                                    start_time=now + timedelta(days=days, hours=v)))
+        db.session.flush()
+        recompute(Venue)
+        recompute(Artist)
+        refresh()
+        db.session.commit()
+        return added_venues
+
+    return seed
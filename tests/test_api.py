@@ -0,0 +1,48 @@
+# /api/v1 collections stream from a server-side cursor; a finished (or
+# abandoned) stream must hand its connection back to the pool.
+import json
+
+import pytest
+
+from models import db
+
+
+@pytest.mark.parametrize('path', ['/api/v1/venues', '/api/v1/artists', '/api/v1/shows',
+                                  '/api/v1/shows?format=ndjson'])
+def test_streamed_collections_release_their_connection(client, seed, path):
+    seed(venues=3, artists=3, shows_per_venue=2)
+    for _ in range(6):
+        response = client.get(path)
+        body = response.get_data(as_text=True)
+        response.close()
+        assert response.status_code == 200 and body
+        assert db.engine.pool.checkedout() == 0
+
+
+def test_abandoned_stream_releases_its_connection(client, seed):
+    seed(venues=3)
+    for _ in range(3):
+        response = client.get('/api/v1/venues?format=ndjson', buffered=False)
+        next(response.response)
+        response.close()
+    assert db.engine.pool.checkedout() == 0
+
+
+def test_collection_lists_every_row(client, seed):
+    seed(venues=3, artists=2, shows_per_venue=2)
+    venues = json.loads(client.get('/api/v1/venues').get_data(as_text=True))
+    shows = [json.loads(line) for line in client.get('/api/v1/shows?format=ndjson').get_data(as_text=True).splitlines()]
+    assert [venue["id"] for venue in venues] == [1, 2, 3]
+    assert len(shows) == 6
+    assert [show["start_time"] for show in shows] == sorted(show["start_time"] for show in shows)
+
+
+def test_export_releases_its_connection(app, client, seed):
+    app.config['API_ADMIN_TOKEN'] = 'secret'
+    seed(venues=3)
+    for _ in range(3):
+        response = client.get('/api/v1/export/venues?format=csv', headers={'Authorization': 'Bearer secret'})
+        lines = response.get_data(as_text=True).splitlines()
+        response.close()
+        assert len(lines) == 4
+        assert db.engine.pool.checkedout() == 0
@@ -0,0 +1,75 @@
+# The ASGI entry point serves the async views itself, so it has to close
+# responses the way a WSGI server does for call_on_close callbacks to run.
+import asyncio
+
+import pytest
+
+asgi = pytest.importorskip('asgi')
+
+from instrumentation import instrumentation  # noqa: E402
+
+
+def test_application_closes_the_response(monkeypatch):
+    reported = []
+    monkeypatch.setattr(instrumentation, 'report', lambda *args: reported.append(args))
+
+    async def view():
+        return 'ok'
+    monkeypatch.setattr(asgi, 'async_view', lambda environ: (view, {}))
+
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/venues', 'headers': []}
+    asyncio.run(asgi.application(scope, receive, send))
+
+    assert [m['type'] for m in sent] == ['http.response.start', 'http.response.body']
+    assert sent[1]['body'] == b'ok'
+    assert len(reported) == 1
+
+
+def test_replica_failures_fall_back_to_the_primary(monkeypatch, database, tmp_path):
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from models import Venue
+    from routing import replicas
+
+    engines = asgi.Engines()
+    engines.primary = create_async_engine('sqlite+aiosqlite:///' + database)
+    # a directory that does not exist cannot be opened
+    engines.replicas = {'replica_1': create_async_engine(
+        'sqlite+aiosqlite:///' + str(tmp_path / 'missing' / 'replica.db'))}
+    monkeypatch.setattr(asgi, 'engines', engines)
+    try:
+        rows = asyncio.run(asgi.fetch(engines.replicas['replica_1'], select(Venue.id)))
+        assert rows == []
+        assert replicas.candidates(['replica_1']) == []
+    finally:
+        replicas.mark_up('replica_1')
+        asyncio.run(engines.dispose())
+
+
+def test_blocking_cache_backends_run_off_the_event_loop(monkeypatch):
+    import threading
+    from cache import cache, NullCache
+
+    calls = []
+
+    class Blocking(NullCache):
+        blocking = True
+
+        def get(self, key):
+            calls.append(threading.get_ident())
+            return None
+
+    async def compute():
+        return {"areas": []}
+
+    monkeypatch.setattr(cache, 'backend', Blocking())
+    assert asyncio.run(asgi.cached_data('venues', compute)) == {"areas": []}
+    assert calls and threading.get_ident() not in calls
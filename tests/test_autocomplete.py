@@ -0,0 +1,56 @@
+# Suggestions come from the in-process prefix index: any word of a name
+# matches, case and accents aside, ranked by upcoming shows, and this
+# worker's committed writes show up without a rebuild or a database read.
+from datetime import datetime, timedelta
+
+from autocomplete import PrefixIndex, autocomplete
+from models import db, Venue, Show
+
+
+def names(found):
+    return [row["name"] for row in found]
+
+
+def test_prefixes_match_any_word_ranked_by_upcoming_shows():
+    index = PrefixIndex([(1, 'The Blue Note', 2), (2, 'Café Du Nord', 5), (3, 'Bluebird', 2), (4, 'Nordic', 0)])
+    assert names(index.search('blue', 10)) == ['Bluebird', 'The Blue Note']
+    assert names(index.search('  CAFE ', 10)) == ['Café Du Nord']
+    assert names(index.search('nord', 10)) == ['Café Du Nord', 'Nordic']
+    assert names(index.search('nord', 1)) == ['Café Du Nord']
+    assert index.search('', 10) == []
+
+    index.add(4, 'Blue Nordic', 9)
+    index.remove(3)
+    index.bump(1, -5)
+    assert [(row["name"], row["upcoming_shows_count"]) for row in index.search('blue', 10)] == \
+        [('Blue Nordic', 9), ('The Blue Note', 0)]
+
+
+def test_endpoint_reads_the_index_not_the_database(client, seed, statements):
+    seed(venues=3, artists=1, shows_per_venue=0)
+    assert names(client.get('/api/v1/autocomplete/venues?q=ven&limit=2').get_json()["data"]) == ['Venue 0', 'Venue 1']
+    statements.reset()
+    assert names(client.get('/api/v1/autocomplete/venues?q=venue 2').get_json()["data"]) == ['Venue 2']
+    assert statements.count == 0
+    assert client.get('/api/v1/autocomplete/artists?q=').get_json() == {"data": []}
+
+
+def test_committed_writes_update_the_index(app, seed):
+    venues = seed(venues=2, artists=1, shows_per_venue=0)
+    assert names(autocomplete.suggest('venues', 'venue')) == ['Venue 0', 'Venue 1']
+
+    venues[0].name = 'The Velvet Room'
+    db.session.add(Show(venue_id=venues[1].id, artist_id=1, start_time=datetime.now() + timedelta(days=2)))
+    db.session.commit()
+    found = autocomplete.suggest('venues', 'v')
+    assert [(row["name"], row["upcoming_shows_count"]) for row in found] == [('Venue 1', 1), ('The Velvet Room', 0)]
+
+    db.session.delete(db.session.get(Venue, venues[1].id))
+    db.session.add(Venue('Velvet Underground', 'San Francisco', 'CA', '1 Main St', '5550000000', '', '', ['Jazz'], ''))
+    db.session.flush()
+    db.session.rollback()
+    assert names(autocomplete.suggest('venues', 'velvet')) == ['The Velvet Room']
+
+    db.session.delete(db.session.get(Venue, venues[1].id))
+    db.session.commit()
+    assert names(autocomplete.suggest('venues', 'v')) == ['The Velvet Room']
@@ -0,0 +1,106 @@
+# Pages are cached until a write handler evicts exactly the names it
+# affects. Evictions are repeated after REPLICA_STICKY_SECONDS when reads can
+# come from a replica, so an entry refilled from a lagging replica does not last.
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache import Cache, LRUCache, cache
+from conftest import make_app
+from models import db, Artist
+
+
+@pytest.fixture
+def cached(app, database):
+    # after `app`, whose create_app() would otherwise re-init the cache as null
+    lru = make_app('sqlite:///' + database, CACHE_BACKEND='lru')
+    with lru.app_context():
+        yield lru
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_lru_entries_expire_and_the_oldest_go_first():
+    lru = LRUCache(2)
+    lru.set('a', 1, 60)
+    lru.set('b', 2, 0.01)
+    time.sleep(0.02)
+    assert lru.get('b') is None
+    lru.set('c', 3, 60)
+    lru.get('a')
+    lru.set('d', 4, 60)
+    assert (lru.get('a'), lru.get('c'), lru.get('d')) == (1, None, 4)
+
+
+def cached_pages(client, *paths):
+    for path in paths:
+        assert client.get(path).status_code == 200
+    client.get('/')  # drops the write's flash message, which skips the cache
+
+
+def test_venue_edit_evicts_its_pages_only(cached, seed):
+    venues = seed(venues=2, artists=2, shows_per_venue=1)
+    venue_id, other_id = venues[0].id, venues[1].id
+    artist_id, other_artist_id = [a for a, in db.session.query(Artist.id).order_by(Artist.id)]
+    client = cached.test_client()
+    cached_pages(client, '/venues', '/venues/{}'.format(venue_id), '/venues/{}'.format(other_id),
+                 '/artists/{}'.format(artist_id), '/artists/{}'.format(other_artist_id))
+
+    client.post('/venues/{}/edit'.format(venue_id), data={
+        'name': 'The Velvet Room', 'city': 'San Francisco', 'state': 'CA', 'address': '2 Main St',
+        'phone': '555-000-0001', 'genres': ['Jazz'], 'image_link': 'https://example.com/v.jpg',
+        'facebook_link': 'https://www.facebook.com/velvet', 'website_link': 'https://example.com'})
+
+    for name in ('venues', 'venue:{}'.format(venue_id), 'artist:{}'.format(artist_id)):
+        assert cache.get('page:' + name) is None, name
+    for name in ('venue:{}'.format(other_id), 'artist:{}'.format(other_artist_id)):
+        assert cache.get('page:' + name) is not None, name
+    client.get('/')
+    assert 'The Velvet Room' in client.get('/artists/{}'.format(artist_id)).get_data(as_text=True)
+
+
+def test_new_show_evicts_both_sides(cached, seed):
+    venue_id = seed(venues=1, artists=2, shows_per_venue=0)[0].id
+    artist_id, other_artist_id = [a for a, in db.session.query(Artist.id).order_by(Artist.id)]
+    client = cached.test_client()
+    cached_pages(client, '/venues', '/venues/{}'.format(venue_id),
+                 '/artists/{}'.format(artist_id), '/artists/{}'.format(other_artist_id), '/shows')
+    assert cache.get('page:shows?after=&before=&from=&to=&city=') is not None
+
+    start = (datetime.now() + timedelta(days=3)).replace(microsecond=0)
+    client.post('/shows/create', data={'venue_id': venue_id, 'artist_id': artist_id,
+                                       'start_time': start.strftime('%Y-%m-%d %H:%M:%S')})
+
+    for name in ('venues', 'venue:{}'.format(venue_id), 'artist:{}'.format(artist_id),
+                 'shows?after=&before=&from=&to=&city='):
+        assert cache.get('page:' + name) is None, name
+    assert cache.get('page:artist:{}'.format(other_artist_id)) is not None
+    client.get('/')
+    assert '1 Upcoming Show' in client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
+
+
+def replica_cache(database, **settings):
+    app = make_app('sqlite:///' + database, CACHE_BACKEND='lru',
+                   SQLALCHEMY_BINDS={'replica_1': 'sqlite:///' + database}, **settings)
+    return Cache(app)
+
+
+def test_eviction_is_repeated_after_the_replica_lag(database):
+    cache = replica_cache(database, REPLICA_STICKY_SECONDS=0.05)
+    cache.set('page:venues', b'old')
+    cache.set('page:shows?city=Oakland', b'old')
+    cache.evict('venues')
+    cache.evict_prefix('shows')
+
+    # rendered from a replica that has not seen the write yet
+    cache.set('page:venues', b'stale')
+    cache.set('page:shows?city=Oakland', b'stale')
+    time.sleep(0.2)
+    assert cache.get('page:venues') is None
+    assert cache.get('page:shows?city=Oakland') is None
+
+
+def test_no_second_eviction_without_replicas(app):
+    cache = Cache(app)
+    assert cache.replica_lag == 0
@@ -0,0 +1,55 @@
+# The show counters the listings and detail pages read, and the commands that
+# recount them once shows start.
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import make_app
+from models import db, Venue, Show
+
+
+@pytest.fixture
+def cached(app, database):
+    # after `app`, whose create_app() would otherwise re-init the cache as null
+    lru = make_app('sqlite:///' + database, CACHE_BACKEND='lru')
+    with lru.app_context():
+        yield lru
+        db.session.remove()
+        db.engine.dispose()
+
+
+def start_upcoming_shows(venue_id):
+    # an hour on: the venue's upcoming shows have started, counters untouched
+    db.session.query(Show).filter(Show.venue_id == venue_id, Show.start_time > datetime.now())\
+        .update({Show.start_time: datetime.now() - timedelta(hours=1)}, synchronize_session=False)
+    db.session.commit()
+
+
+def test_rollover_moves_started_shows_and_evicts_their_pages(cached, seed):
+    venue_id = seed(venues=1, artists=1, shows_per_venue=2)[0].id
+    client = cached.test_client()
+    assert '1 Upcoming Show' in client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
+
+    start_upcoming_shows(venue_id)
+    result = cached.test_cli_runner().invoke(args=['counters', 'rollover'])
+    assert result.exit_code == 0
+    assert 'Recounted 1 venues and 1 artists.' in result.output
+
+    venue = db.session.get(Venue, venue_id)
+    assert (venue.upcoming_shows_count, venue.past_shows_count) == (0, 2)
+    page = client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
+    assert '0 Upcoming Shows' in page
+    assert '2 Past Shows' in page
+
+
+def test_check_fix_repairs_drift_and_evicts_its_pages(cached, seed):
+    venue_id = seed(venues=1, artists=1, shows_per_venue=2)[0].id
+    client = cached.test_client()
+    client.get('/venues/{}'.format(venue_id))
+
+    start_upcoming_shows(venue_id)
+    runner = cached.test_cli_runner()
+    assert 'venues {}: upcoming 1 != 0'.format(venue_id) in runner.invoke(args=['counters', 'check']).output
+    assert runner.invoke(args=['counters', 'check', '--fix']).exit_code == 0
+    assert 'Counters are consistent.' in runner.invoke(args=['counters', 'check']).output
+    assert '0 Upcoming Shows' in client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
@@ -0,0 +1,73 @@
+# Exports stream every column of every row, oldest id first, and with
+# `since` only the rows updated from then on.
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from exporter import csv_lines, export_rows, ndjson_lines
+from models import db, Venue
+
+
+@pytest.fixture
+def exported(app, seed):
+    seed(venues=3, artists=2, shows_per_venue=2)
+    # the first two venues were last changed a week ago
+    db.session.query(Venue).filter(Venue.id < 3)\
+        .update({Venue.updated_at: datetime.utcnow() - timedelta(days=7)}, synchronize_session=False)
+    db.session.commit()
+    return app
+
+
+def test_ndjson_has_every_column(exported):
+    rows = [json.loads(line) for line in ndjson_lines('venues', export_rows('venues', batch_size=2))]
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert set(rows[0]) == {column.name for column in Venue.__table__.columns}
+    assert rows[0]["genres"] == ['Jazz', 'Folk']
+    datetime.fromisoformat(rows[0]["updated_at"])
+
+
+def test_csv_has_a_header_and_joins_genres(exported):
+    rows = list(csv.DictReader(io.StringIO(''.join(csv_lines('venues', export_rows('venues'))))))
+    assert [row["name"] for row in rows] == ['Venue 0', 'Venue 1', 'Venue 2']
+    assert rows[0]["genres"] == 'Jazz,Folk'
+
+
+def test_since_exports_changed_rows_only(exported):
+    since = datetime.utcnow() - timedelta(days=1)
+    assert [row["id"] for row in export_rows('venues', since)] == [3]
+    assert len(list(export_rows('shows', since))) == 6
+
+
+def test_command_writes_a_file_per_kind(exported, tmp_path):
+    result = exported.test_cli_runner().invoke(args=['export', '--format', 'csv', '--output', str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    lines = {kind: (tmp_path / '{}.csv'.format(kind)).read_text().splitlines() for kind in ('venues', 'artists', 'shows')}
+    assert {kind: len(rows) for kind, rows in lines.items()} == {'venues': 4, 'artists': 3, 'shows': 7}
+
+    result = exported.test_cli_runner().invoke(args=['export', 'venues', '--since', '2000-01-01'])
+    assert [json.loads(line)["id"] for line in result.output.splitlines()] == [1, 2, 3]
+    assert exported.test_cli_runner().invoke(args=['export', '--format', 'parquet']).exit_code == 2
+
+
+def test_parquet_export(exported, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    result = exported.test_cli_runner().invoke(
+        args=['export', 'venues', '--format', 'parquet', '--output', str(tmp_path), '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    table = pq.read_table(str(tmp_path / 'venues.parquet'))
+    assert table.column('id').to_pylist() == [1, 2, 3]
+    assert table.column('genres').to_pylist()[0] == ['Jazz', 'Folk']
+
+
+def test_endpoint_needs_the_token_and_a_valid_since(exported, client):
+    exported.config['API_ADMIN_TOKEN'] = 'secret'
+    auth = {'Authorization': 'Bearer secret'}
+    assert client.get('/api/v1/export/venues').status_code == 401
+    assert client.get('/api/v1/export/venues?since=yesterday', headers=auth).status_code == 400
+    assert client.get('/api/v1/export/venues?format=parquet', headers=auth).status_code == 400
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    body = client.get('/api/v1/export/venues', query_string={'since': since}, headers=auth).get_data(as_text=True)
+    assert [json.loads(line)["id"] for line in body.splitlines()] == [3]
@@ -0,0 +1,95 @@
+# ?genre= (all must match), ?city=, ?state= and ?upcoming=1 narrow the venue
+# and artist listings and searches, which also count the matches per genre
+# and per city in the same constant number of statements.
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from counters import recompute
+from facets import NO_FILTERS, parse_filters
+from models import db, Venue, Artist, Show
+from queries import artist_listing, venue_listing
+from search import search
+
+
+def venue(name, city, state, genres):
+    return Venue(name, city, state, '1 Main St', '5550000000', '', '', genres, '')
+
+
+@pytest.fixture
+def listed(app):
+    venues = [
+        venue('The Musical Hop', 'San Francisco', 'CA', ['Jazz', 'Reggae']),
+        venue('The Blue Note', 'San Francisco', 'CA', ['Jazz', 'Blues']),
+        venue('Cafe Du Nord', 'San Francisco', 'CA', ['Folk']),
+        venue('The Dueling Pianos Bar', 'New York', 'NY', ['Jazz', 'Classical']),
+    ]
+    artist = Artist('Guns N Petals', 'San Francisco', 'CA', '5550000000', '', '', ['Rock n Roll'], '')
+    db.session.add_all(venues + [artist])
+    db.session.flush()
+    # only the Musical Hop has an upcoming show
+    db.session.add(Show(venue_id=venues[0].id, artist_id=artist.id, start_time=datetime.now() + timedelta(days=3)))
+    db.session.add(Show(venue_id=venues[1].id, artist_id=artist.id, start_time=datetime.now() - timedelta(days=3)))
+    db.session.flush()
+    recompute(Venue)
+    recompute(Artist)
+    db.session.commit()
+
+
+def filters(**args):
+    return parse_filters(MultiDict(args))
+
+
+def venue_names(listing):
+    return sorted(venue["name"] for area in listing["areas"] for venue in area["venues"])
+
+
+def test_parse_filters():
+    values = MultiDict([('genre', 'jazz'), ('genre', ' BLUES '), ('genre', 'polka'),
+                        ('city', ' San Francisco '), ('state', 'ca'), ('upcoming', '1')])
+    assert parse_filters(values) == {
+        "genres": ['Blues', 'Jazz'], "city": 'San Francisco', "state": 'CA', "upcoming": True}
+    assert parse_filters(MultiDict()) == NO_FILTERS
+
+
+@pytest.mark.parametrize('args, expected', [
+    ({}, ['Cafe Du Nord', 'The Blue Note', 'The Dueling Pianos Bar', 'The Musical Hop']),
+    ({'genre': ['Jazz']}, ['The Blue Note', 'The Dueling Pianos Bar', 'The Musical Hop']),
+    ({'genre': ['Jazz', 'Blues']}, ['The Blue Note']),
+    ({'genre': ['Jazz'], 'city': 'San Francisco', 'upcoming': '1'}, ['The Musical Hop']),
+    ({'state': 'NY'}, ['The Dueling Pianos Bar']),
+    ({'genre': ['Folk'], 'state': 'NY'}, []),
+])
+def test_venue_filters(listed, args, expected):
+    values = MultiDict([(key, value) for key, values in args.items()
+                        for value in (values if isinstance(values, list) else [values])])
+    assert venue_names(venue_listing(parse_filters(values))) == expected
+
+
+def test_facets_count_the_matches(listed):
+    facets = venue_listing(filters(city='San Francisco'))["facets"]
+    assert facets["genres"] == [
+        {"genre": 'Jazz', "count": 2},
+        {"genre": 'Blues', "count": 1},
+        {"genre": 'Folk', "count": 1},
+        {"genre": 'Reggae', "count": 1},
+    ]
+    assert facets["cities"] == [{"city": 'San Francisco', "state": 'CA', "count": 3}]
+    assert artist_listing(filters(genre='Rock n Roll'))["facets"]["cities"] == \
+        [{"city": 'San Francisco', "state": 'CA', "count": 1}]
+
+
+def test_search_filters_and_facets(listed):
+    rows, count, facets = search(Venue, 'the', 20, filters=filters(genre='Jazz'))
+    assert sorted(row.name for row in rows) == ['The Blue Note', 'The Dueling Pianos Bar', 'The Musical Hop']
+    assert count == 3
+    assert facets["cities"] == [{"city": 'San Francisco', "state": 'CA', "count": 2},
+                                {"city": 'New York', "state": 'NY', "count": 1}]
+
+
+def test_filtered_listing_costs_two_statements(listed, client, statements):
+    statements.reset()
+    body = client.get('/venues?genre=jazz&city=San+Francisco').get_data(as_text=True)
+    assert statements.count == 2, statements.statements
+    assert 'The Blue Note' in body and 'Cafe Du Nord' not in body
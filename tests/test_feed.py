@@ -0,0 +1,61 @@
+# /shows reads the show_feed summary table, which writes refresh through the
+# refresh_feed task before the cached pages are evicted.
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import make_app
+from feed import refresh
+from models import db, ShowFeed
+
+
+@pytest.fixture
+def cached(app, database):
+    # after `app`, whose create_app() would otherwise re-init the cache as null
+    lru = make_app('sqlite:///' + database, CACHE_BACKEND='lru', API_ADMIN_TOKEN='secret')
+    with lru.app_context():
+        yield lru
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_refresh_keeps_shows_from_today_on(app, seed):
+    seed(venues=2, artists=2, shows_per_venue=4)
+    assert refresh() == 4
+    db.session.commit()
+    now = datetime.now()
+    starts = [start for start, in db.session.query(ShowFeed.start_time)]
+    assert len(starts) == 4
+    assert all(start >= now.replace(hour=0, minute=0, second=0, microsecond=0) for start in starts)
+
+
+def test_booking_shows_up_on_cached_pages(cached, seed):
+    venue = seed(venues=1, artists=2, shows_per_venue=0)[0]
+    client = cached.test_client()
+    assert 'Artist 1' not in client.get('/shows').get_data(as_text=True)
+
+    start = (datetime.now() + timedelta(days=3)).replace(microsecond=0)
+    response = client.post('/api/v1/shows', headers={'Authorization': 'Bearer secret'}, data=json.dumps(
+        {"artist_id": 2, "shows": [{"venue_id": venue.id, "start_time": start.isoformat()}]}),
+        content_type='application/json')
+    assert response.status_code == 201
+
+    assert 'Artist 1' in client.get('/shows').get_data(as_text=True)
+
+
+def test_venue_edits_refresh_its_rows(cached, seed):
+    venue = seed(venues=1, artists=1, shows_per_venue=2, city='Oakland')[0]
+    client = cached.test_client()
+    assert 'Oakland' in client.get('/shows?city=Oakland').get_data(as_text=True)
+
+    response = client.post('/venues/{}/edit'.format(venue.id), data={
+        'name': 'The Velvet Room', 'city': 'Berkeley', 'state': 'CA', 'address': '2 Main St',
+        'phone': '555-000-0001', 'genres': ['Jazz'], 'image_link': 'https://example.com/v.jpg',
+        'facebook_link': 'https://www.facebook.com/velvet', 'website_link': 'https://example.com'})
+    assert response.status_code in (200, 302)
+
+    assert [row.venue_name for row in db.session.query(ShowFeed)] == ['The Velvet Room']
+    client.get('/')  # shows the edit's flash message
+    assert 'The Velvet Room' not in client.get('/shows?city=Oakland').get_data(as_text=True)
+    assert 'The Velvet Room' in client.get('/shows?city=Berkeley').get_data(as_text=True)
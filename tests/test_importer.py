@@ -0,0 +1,53 @@
+# Imported shows follow the booking rules: a show whose venue or artist is
+# missing or already booked near that time is an error for its row.
+import io
+import json
+
+from importer import import_rows, read_rows
+from models import db, Show, Venue
+
+
+def ndjson(*rows):
+    return read_rows(io.StringIO('\n'.join(json.dumps(row) for row in rows)), 'ndjson')
+
+
+def test_show_import_reports_conflicts_per_row(app, seed):
+    venue = seed(venues=1, artists=2, shows_per_venue=0)[0]
+    shows = db.session.query(Show).count()
+
+    result = import_rows('shows', ndjson(
+        {"venue_id": venue.id, "artist_id": 1, "start_time": "2031-05-01T20:00:00"},
+        {"venue_id": venue.id, "artist_id": 2, "start_time": "2031-05-01T21:00:00"},
+        {"venue_id": 999, "artist_id": 2, "start_time": "2031-05-02T20:00:00"},
+        {"venue_id": venue.id, "artist_id": 1, "start_time": "2031-05-01T20:00:00"},
+        {"venue_id": venue.id, "artist_id": 2, "start_time": "2031-05-03T20:00:00"},
+    ), batch_size=2)
+
+    assert result.inserted == 2
+    assert result.duplicates == 1
+    assert [error["record"] for error in result.errors] == [2, 3]
+    assert list(result.errors[0]["errors"]) == ['venue_id']
+    assert result.errors[1]["errors"] == {"venue_id": ['There is no venue 999.']}
+    assert db.session.query(Show).count() == shows + 2
+
+
+def test_duplicate_lookup_uses_the_name_key_index(app, statements):
+    from importer import existing_named_keys
+    existing_named_keys(Venue, {('the musical hop', 'San Francisco', 'CA')})
+    plan = db.session.connection().exec_driver_sql(
+        'EXPLAIN QUERY PLAN ' + statements.statements[-1], statements.parameters[-1]).all()
+    assert 'ix_venues_name_key' in str(plan)
+
+
+def test_named_rows_are_deduplicated_case_insensitively(app, seed):
+    seed(venues=1, artists=0, shows_per_venue=0)
+    venues = db.session.query(Venue).count()
+    row = {"name": "VENUE 0", "city": "San Francisco", "state": "CA", "address": "1 Main St",
+           "phone": "555-000-0000", "genres": ["Jazz"], "image_link": "https://example.com/v.jpg",
+           "facebook_link": "https://www.facebook.com/v", "website_link": "https://example.com",
+           "seeking_talent": False, "seeking_description": ""}
+
+    result = import_rows('venues', ndjson(row, dict(row, name="Venue 0"), dict(row, city="Oakland")))
+
+    assert (result.inserted, result.duplicates, result.errors) == (1, 2, [])
+    assert db.session.query(Venue).count() == venues + 1
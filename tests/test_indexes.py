@@ -0,0 +1,82 @@
+# The venue and artist pages and the upcoming shows counters read a venue's
+# or artist's shows by (venue_id, start_time) / (artist_id, start_time).
+# These tests run the real statements, EXPLAIN them and check the planner
+# picks ix_shows_venue_id_start_time and ix_shows_artist_id_start_time.
+#
+# SQLite always runs; Postgres runs when TEST_POSTGRES_URL names a scratch
+# database (it is migrated to head). Postgres is told to avoid sequential
+# scans, since on near-empty tables it would rightly prefer them.
+import os
+from datetime import datetime
+
+import pytest
+
+from conftest import StatementCounter, make_app, migrate
+from counters import recompute
+from models import db, Venue, Artist
+from queries import artist_detail, artist_shows_statement, venue_detail, venue_shows_statement
+
+VENUE_INDEX = 'ix_shows_venue_id_start_time'
+ARTIST_INDEX = 'ix_shows_artist_id_start_time'
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def planner(request, app):
+    if request.param == 'sqlite':
+        yield app
+        return
+    uri = os.environ.get('TEST_POSTGRES_URL')
+    if not uri:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    migrate(uri)
+    postgres = make_app(uri)
+    with postgres.app_context():
+        db.session.execute(db.text('SET enable_seqscan = off'))
+        yield postgres
+        db.session.rollback()
+        db.engine.dispose()
+
+
+def plans(run):
+    """The query plan of each statement run() executes, as text."""
+    counter = StatementCounter(db.engine)
+    try:
+        run()
+    finally:
+        counter.close()
+    sqlite = db.engine.dialect.name == 'sqlite'
+    explained = []
+    for statement, parameters in zip(counter.statements, counter.parameters):
+        if statement.lstrip().upper().startswith('EXPLAIN'):
+            continue
+        prefix = 'EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN '
+        rows = db.session.connection().exec_driver_sql(prefix + statement, parameters)
+        explained.append('\n'.join(str(row[-1]) for row in rows))
+    return explained
+
+
+def assert_uses(index, explained):
+    assert explained
+    for plan in explained:
+        assert index in plan, plan
+
+
+def test_venue_page_uses_the_venue_index(planner):
+    assert_uses(VENUE_INDEX, plans(lambda: venue_detail(1)))
+
+
+def test_artist_page_uses_the_artist_index(planner):
+    assert_uses(ARTIST_INDEX, plans(lambda: artist_detail(1)))
+
+
+@pytest.mark.parametrize('upcoming', [True, False])
+def test_async_show_lists_use_the_indexes(planner, upcoming):
+    now = datetime.now()
+    assert_uses(VENUE_INDEX, plans(lambda: db.session.execute(venue_shows_statement(1, upcoming, now)).all()))
+    assert_uses(ARTIST_INDEX, plans(lambda: db.session.execute(artist_shows_statement(1, upcoming, now)).all()))
+
+
+def test_show_counts_use_the_indexes(planner):
+    # recompute() counts upcoming and past shows with correlated subqueries
+    assert_uses(VENUE_INDEX, plans(lambda: recompute(Venue, [1])))
+    assert_uses(ARTIST_INDEX, plans(lambda: recompute(Artist, [1])))
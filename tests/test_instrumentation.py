@@ -0,0 +1,42 @@
+# Per-request SQL stats: Server-Timing headers, and a JSON line in
+# SQL_SLOW_LOG for slow or N+1 requests, a file only opened when needed.
+import json
+import logging
+
+import pytest
+
+from conftest import make_app
+from models import db
+
+
+@pytest.fixture
+def slow_log(database, tmp_path):
+    logger = logging.getLogger('fyyur.sql')
+    saved = logger.handlers[:], logger.propagate
+    logger.handlers = []
+    path = tmp_path / 'slow.log'
+    app = make_app('sqlite:///' + database, SQL_SLOW_LOG=str(path), SQL_SLOW_REQUEST_STATEMENTS=1)
+    with app.app_context():
+        yield app, path
+        db.session.remove()
+        db.engine.dispose()
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers, logger.propagate = saved
+
+
+def test_slow_log_is_only_created_by_a_slow_request(slow_log):
+    app, path = slow_log
+    assert not path.exists()
+
+    response = app.test_client().get('/venues')
+    response.close()
+    entry = json.loads(path.read_text().splitlines()[-1])
+    assert entry["path"] == '/venues'
+    assert 'statements' in entry["reasons"]
+    assert entry["statements"] == 2
+
+
+def test_server_timing_header(client):
+    timing = client.get('/venues').headers['Server-Timing']
+    assert 'db' in timing
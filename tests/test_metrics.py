@@ -0,0 +1,42 @@
+# Every app made in a process shares the metrics extension; each /metrics
+# renders the process-wide counters once plus that app's own gauges.
+from conftest import make_app
+
+
+def test_each_app_renders_its_gauges_once(app, database):
+    other = make_app('sqlite:///' + database)
+    for each in (app, other):
+        body = each.test_client().get('/metrics').get_data(as_text=True)
+        assert body.count('# TYPE fyyur_db_pool_connections gauge') == 1
+        assert body.count('# TYPE fyyur_cache_hit_ratio gauge') == 1
+        assert body.count('# TYPE fyyur_http_requests_total counter') == 1
+
+
+def test_exited_threads_fold_their_shards():
+    import gc
+    import threading
+    from metrics import Counter
+
+    counter = Counter('test_threads_total', 'Increments from short-lived threads.', ('kind',))
+    for _ in range(200):
+        thread = threading.Thread(target=counter.inc, args=('x',))
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert len(counter._shards) <= 1
+    assert counter.values() == {('x',): 200}
+
+
+def test_pool_waits_are_timed_after_dispose(app):
+    from metrics import POOL_WAIT
+    from models import db, Venue
+
+    def checkouts():
+        # the bucket counts, without the running sum in the last slot
+        return sum(sum(counts[:-1]) for counts in POOL_WAIT.values().values())
+
+    db.engine.dispose()
+    before = checkouts()
+    db.session.remove()
+    db.session.query(Venue).count()
+    assert checkouts() == before + 1
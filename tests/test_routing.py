@@ -0,0 +1,66 @@
+# Read-only views read from the replica bind; writes, and the reads after them,
+# go to the primary. The replica is a second SQLite file holding different
+# rows, so each response shows which database served it.
+import shutil
+
+import pytest
+
+from conftest import make_app
+from models import db, Venue
+from routing import replicas
+
+
+def add_venue(engine, name):
+    with engine.begin() as conn:
+        conn.execute(Venue.__table__.insert().values(
+            name=name, city='San Francisco', state='CA', address='1 Main St', phone='5550000000',
+            genres=['Jazz'], seeking_talent=False))
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return {name for name, in conn.execute(db.select(Venue.name))}
+
+
+@pytest.fixture
+def routed(migrated, database, tmp_path):
+    replica = str(tmp_path / 'replica.db')
+    shutil.copy(migrated, replica)
+    app = make_app('sqlite:///' + database, SQLALCHEMY_BINDS={'replica_1': 'sqlite:///' + replica})
+    with app.app_context():
+        replicas.mark_up('replica_1')
+        add_venue(db.engines[None], 'Primary Hall')
+        add_venue(db.engines['replica_1'], 'Replica Hall')
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_get_reads_from_the_replica(routed):
+    body = routed.test_client().get('/venues').get_data(as_text=True)
+    assert 'Replica Hall' in body
+    assert 'Primary Hall' not in body
+
+
+def test_read_only_post_reads_from_the_replica(routed):
+    body = routed.test_client().post('/venues/search', data={'search_term': 'Hall'}).get_data(as_text=True)
+    assert 'Replica Hall' in body
+    assert 'Primary Hall' not in body
+
+
+def test_post_writes_to_the_primary_and_sticks_to_it(routed):
+    client = routed.test_client()
+    response = client.post('/venues/create', data={
+        'name': 'New Hall', 'city': 'San Francisco', 'state': 'CA', 'address': '2 Main St',
+        'phone': '555-000-0001', 'genres': ['Jazz'], 'image_link': 'https://example.com/new.jpg',
+        'facebook_link': 'https://www.facebook.com/newhall', 'website_link': 'https://example.com'})
+    assert response.status_code == 200
+
+    assert 'New Hall' in names(db.engines[None])
+    assert 'New Hall' not in names(db.engines['replica_1'])
+
+    # within REPLICA_STICKY_SECONDS this client reads its own write
+    body = client.get('/venues').get_data(as_text=True)
+    assert 'New Hall' in body
+    assert 'Replica Hall' not in body
@@ -0,0 +1,106 @@
+# Search matches any substring of "name city state", case-insensitively, or
+# a genre by its exact name, the same on SQLite (trigram FTS5, LIKE for short
+# terms) as on Postgres (LIKE over a pg_trgm index).
+import re
+
+import pytest
+
+from models import db, Venue, Artist
+from search import search
+
+
+def venue(name, city='San Francisco', state='CA', genres=('Folk',)):
+    return Venue(name, city, state, '1 Main St', '5550000000', '', '', list(genres), '')
+
+
+def artist(name, genres=('Folk',)):
+    return Artist(name, 'San Francisco', 'CA', '5550000000', '', '', list(genres), '')
+
+
+@pytest.fixture
+def listed(app):
+    db.session.add_all([
+        venue('The Musical Hop', genres=['Jazz', 'Reggae']),
+        venue('Park Square Live Music & Coffee', city='New York', state='NY'),
+        venue('The Dueling Pianos Bar', city='New York', state='NY'),
+        artist('Guns N Petals'),
+        artist('Matt Quevedo', genres=['Jazz']),
+        artist('The Wild Sax Band'),
+    ])
+    db.session.commit()
+
+
+def names(model, term):
+    rows, count, _ = search(model, term, 20)
+    assert count == len(rows)
+    return sorted(row.name for row in rows)
+
+
+@pytest.mark.parametrize('term, expected', [
+    ('Hop', ['The Musical Hop']),
+    ('Music', ['Park Square Live Music & Coffee', 'The Musical Hop']),
+    ('usic', ['Park Square Live Music & Coffee', 'The Musical Hop']),
+    ('new york', ['Park Square Live Music & Coffee', 'The Dueling Pianos Bar']),
+    ('pianos bar', ['The Dueling Pianos Bar']),
+    ('jazz', ['The Musical Hop']),
+    ('ny', ['Park Square Live Music & Coffee', 'The Dueling Pianos Bar']),
+    ('', ['Park Square Live Music & Coffee', 'The Dueling Pianos Bar', 'The Musical Hop']),
+    ('zzz', []),
+])
+def test_venue_search(listed, term, expected):
+    assert names(Venue, term) == expected
+
+
+@pytest.mark.parametrize('term, expected', [
+    ('A', ['Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band']),
+    ('band', ['The Wild Sax Band']),
+    ('Jazz', ['Matt Quevedo']),
+    ('"', []),
+])
+def test_artist_search(listed, term, expected):
+    assert names(Artist, term) == expected
+
+
+def test_search_follows_renames_and_deletes(listed):
+    hop = Venue.query.filter_by(name='The Musical Hop').one()
+    hop.name = 'The Velvet Room'
+    db.session.delete(Venue.query.filter_by(name='The Dueling Pianos Bar').one())
+    db.session.commit()
+    assert names(Venue, 'velvet') == ['The Velvet Room']
+    assert names(Venue, 'Hop') == []
+    assert names(Venue, 'pianos') == []
+
+
+def test_search_page(client, listed):
+    body = client.post('/artists/search', data={'search_term': 'A'}).get_data(as_text=True)
+    for name in ('Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band'):
+        assert name in body
+
+
+def test_search_counts_upcoming_shows_in_constant_statements(seed, statements):
+    seed(venues=2, artists=2, shows_per_venue=4)
+    statements.reset()
+    rows, count, _ = search(Venue, 'venue', 20)
+    few = statements.count
+    assert (count, [row.num_upcoming_shows for row in rows]) == (2, [2, 2])
+
+    seed(venues=6, artists=2, shows_per_venue=4)
+    statements.reset()
+    rows, count, _ = search(Venue, 'venue', 20)
+    assert (count, [row.num_upcoming_shows for row in rows]) == (8, [2] * 8)
+    assert statements.count == few == 3
+
+
+def test_search_pages(app, client, seed):
+    seed(venues=5, artists=1, shows_per_venue=0)
+    pages = [[row.name for row in search(Venue, 'venue', 2, offset)[0]] for offset in (0, 2, 4)]
+    assert sorted(sum(pages, [])) == ['Venue {}'.format(i) for i in range(5)]
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+    body = client.post('/venues/search?page=3&per_page=2', data={'search_term': 'venue'}).get_data(as_text=True)
+    assert len(re.findall(r'href="/venues/\d+"', body)) == 1
+    assert 'page=2' in body and 'page=4' not in body
+
+    app.config['SEARCH_MAX_PER_PAGE'] = 3
+    body = client.post('/venues/search?per_page=50', data={'search_term': 'venue'}).get_data(as_text=True)
+    assert len(re.findall(r'href="/venues/\d+"', body)) == 3
@@ -0,0 +1,65 @@
+# /shows pages through the upcoming shows feed on (start_time, id) cursors:
+# ?after= walks forward, ?before= walks back, and no show is skipped or
+# repeated, even where shows share a start time.
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from feed import refresh
+from models import db, Show, ShowFeed
+from queries import show_page
+
+
+@pytest.fixture
+def feed(app, seed):
+    app.config['SHOWS_PER_PAGE'] = 2
+    venues = seed(venues=3, artists=3, shows_per_venue=4)
+    # three shows at the same time, which only the id orders
+    start = (datetime.now() + timedelta(days=10)).replace(microsecond=0)
+    db.session.add_all(Show(venue_id=venue.id, artist_id=1, start_time=start) for venue in venues)
+    db.session.flush()
+    refresh()
+    db.session.commit()
+    return [show_id for show_id, in db.session.query(ShowFeed.show_id)
+            .filter(ShowFeed.start_time >= datetime.now())
+            .order_by(ShowFeed.start_time, ShowFeed.show_id)]
+
+
+def today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ids(page):
+    return [show["id"] for show in page["shows"]]
+
+
+def test_pages_walk_forward_and_back_over_every_show(feed):
+    assert len(feed) == 9
+
+    pages = [show_page(None, None, today())]
+    while pages[-1]["next_cursor"]:
+        pages.append(show_page(pages[-1]["next_cursor"], None, today()))
+    assert [show_id for page in pages for show_id in ids(page)] == feed
+    assert [len(ids(page)) for page in pages] == [2, 2, 2, 2, 1]
+    assert pages[0]["prev_cursor"] is None
+
+    back = [pages[-1]]
+    while back[-1]["prev_cursor"]:
+        back.append(show_page(None, back[-1]["prev_cursor"], today()))
+    assert [ids(page) for page in reversed(back)] == [ids(page) for page in pages]
+    # walking back lands on a first page that still links forward
+    assert back[-1]["next_cursor"] is not None
+
+
+def test_garbled_cursors_read_the_first_page(feed):
+    assert ids(show_page('yesterday', None, today())) == feed[:2]
+    assert ids(show_page(None, '20310101T000000000000_x', today())) == feed[:2]
+
+
+def test_shows_page_links_the_next_page(client, feed):
+    page = client.get('/shows').get_data(as_text=True)
+    after = re.search(r'/shows\?after=([^"&]+)', page).group(1)
+    later = client.get('/shows?after=' + after).get_data(as_text=True)
+    assert 'before=' in later
+    assert client.get('/shows?from=someday').status_code == 400
@@ -0,0 +1,39 @@
+# Deferred tasks run after the write commits, and their cache evictions must
+# reach the processes serving pages.
+import pytest
+
+from conftest import make_app
+from models import db, Artist
+
+
+def test_database_backend_needs_a_shared_cache(database):
+    with pytest.raises(ValueError, match='per process'):
+        make_app('sqlite:///' + database, TASK_BACKEND='database', CACHE_BACKEND='lru')
+    make_app('sqlite:///' + database, TASK_BACKEND='database', CACHE_BACKEND='null')
+
+
+@pytest.fixture
+def cached(app, database):
+    # after `app`, whose create_app() would otherwise re-init the cache as null
+    lru = make_app('sqlite:///' + database, CACHE_BACKEND='lru')
+    with lru.app_context():
+        yield lru
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_venue_delete_recounts_and_evicts_its_artists(cached, seed):
+    venue = seed(venues=1, artists=1, shows_per_venue=2)[0]
+    venue_id, venue_name = venue.id, venue.name
+    artist_id = db.session.query(Artist.id).scalar()
+    client = cached.test_client()
+    assert venue_name in client.get('/artists/{}'.format(artist_id)).get_data(as_text=True)
+
+    response = client.delete('/venues/{}'.format(venue_id))
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    artist = db.session.get(Artist, artist_id)
+    assert (artist.upcoming_shows_count, artist.past_shows_count) == (0, 0)
+    client.get('/')  # shows the delete's flash message
+    assert venue_name not in client.get('/artists/{}'.format(artist_id)).get_data(as_text=True)
@@ -0,0 +1,73 @@
+# {% cache name[, ttl] %} fragments live in the page cache under
+# fragment:<name> and go with the evictions of that name; templates compile
+# into the bytecode cache ahead of time, and slow renders are logged.
+import logging
+import os
+import time
+
+import pytest
+from flask import render_template_string
+
+from cache import cache
+from conftest import make_app
+from models import db
+
+TILE = "{% cache 'tile', ttl %}<b>{{ value }}</b>{% endcache %}"
+
+
+@pytest.fixture
+def cached(app, database):
+    # after `app`, whose create_app() would otherwise re-init the cache as null
+    lru = make_app('sqlite:///' + database, CACHE_BACKEND='lru')
+    with lru.app_context():
+        yield lru
+        db.session.remove()
+        db.engine.dispose()
+
+
+def render(value, ttl=None):
+    return render_template_string(TILE, value=value, ttl=ttl)
+
+
+def test_fragments_are_cached_until_evicted(cached):
+    with cached.test_request_context():
+        assert render('<one>') == '<b>&lt;one&gt;</b>'
+        assert render('two') == '<b>&lt;one&gt;</b>'
+        cache.evict('tile')
+        assert render('two') == '<b>two</b>'
+
+
+def test_fragment_ttl(cached):
+    with cached.test_request_context():
+        render('one', ttl=0.01)
+        time.sleep(0.02)
+        assert render('two') == '<b>two</b>'
+
+
+def test_venue_edit_evicts_its_tile(cached, seed):
+    venue_id = seed(venues=2, artists=1, shows_per_venue=0)[0].id
+    client = cached.test_client()
+    client.get('/venues')
+    assert cache.get('fragment:venue:{}'.format(venue_id)) is not None
+
+    client.post('/venues/{}/edit'.format(venue_id), data={
+        'name': 'The Velvet Room', 'city': 'San Francisco', 'state': 'CA', 'address': '2 Main St',
+        'phone': '555-000-0001', 'genres': ['Jazz'], 'image_link': 'https://example.com/v.jpg',
+        'facebook_link': 'https://www.facebook.com/velvet', 'website_link': 'https://example.com'})
+    client.get('/')
+    assert 'The Velvet Room' in client.get('/venues').get_data(as_text=True)
+
+
+def test_compile_fills_the_bytecode_cache(database, tmp_path):
+    app = make_app('sqlite:///' + database, TEMPLATE_BYTECODE_CACHE=True, TEMPLATE_CACHE_DIR=str(tmp_path))
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code == 0, result.output
+    names = app.jinja_env.list_templates(extensions=['html'])
+    assert names and len(os.listdir(str(tmp_path))) >= len(names)
+
+
+def test_renders_over_the_threshold_are_logged(app, client, caplog):
+    app.extensions['templating'].log_ms = 0
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        client.get('/')
+    assert any(record.getMessage().startswith('Rendered pages/home.html in ') for record in caplog.records)
@@ -0,0 +1,28 @@
+# /venues reads the denormalized counters, so the number of statements it
+# runs must not grow with the number of venues or shows.
+
+VENUES_STATEMENTS = 2  # the areas query and the facet counts
+
+
+def venue_listing_statements(client, statements):
+    statements.reset()
+    response = client.get('/venues')
+    assert response.status_code == 200
+    return statements.count
+
+
+def test_venues_runs_a_constant_number_of_statements(client, statements, seed):
+    seed(venues=2, artists=2, shows_per_venue=2)
+    few = venue_listing_statements(client, statements)
+
+    seed(venues=40, artists=10, shows_per_venue=6, city='Oakland')
+    many = venue_listing_statements(client, statements)
+
+    assert few == many == VENUES_STATEMENTS, statements.statements
+
+
+def test_venues_lists_every_venue(client, seed):
+    venues = seed(venues=3)
+    body = client.get('/venues').get_data(as_text=True)
+    for venue in venues:
+        assert venue.name in body
@@ -0,0 +1,204 @@
+import re
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, abort
+from models import db, Venue, Show
+from search import search, search_page
+from routing import read_only
+from cache import cache
+from tasks import recount_artists
+from feed import refresh_feed
+from queries import venue_listing, venue_detail
+from facets import parse_filters, filtered
+from pages import venue_cache_names, evict_pages, listing_page_name
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+# The venue pages, forms and writes. Form classes are imported inside the
+# views that use them, so WTForms loads on the first form request rather than
+# when a worker starts.
+
+blueprint = Blueprint('venues', __name__)
+
+
+@blueprint.route('/venues')
+@cache.cached_page(listing_page_name('venues'))
+def venues():
+  # ?genre=&city=&state=&upcoming=1 narrow the list; see facets.py
+  filters = parse_filters(request.args)
+  if filtered(filters):
+    listing = venue_listing(filters)
+  else:
+    listing = cache.data('venues', venue_listing)
+  return render_template('pages/venues.html', filters=filters, **listing)
+
+@blueprint.route('/venues/search', methods=['POST'])
+@read_only
+def search_venues():
+  # ranked, indexed search over venue name, city, state and genres.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term = request.form.get('search_term', '')
+  page, per_page = search_page()
+  filters = parse_filters(request.args)
+  venues, count, facets = search(Venue, search_term, per_page, (page - 1) * per_page, filters)
+
+  response = {}
+  response["count"] = count
+  response["data"] = [venue._asdict() for venue in venues]
+  response["page"] = page
+  response["pages"] = -(-count // per_page)
+  response["per_page"] = per_page
+  return render_template('pages/search_venues.html', results=response, search_term=search_term,
+                         filters=filters, facets=facets)
+
+@blueprint.route('/venues/<int:venue_id>')
+@cache.cached_page(lambda venue_id: 'venue:{}'.format(venue_id))
+def show_venue(venue_id):
+  data = cache.data('venue:{}'.format(venue_id), lambda: venue_detail(venue_id))
+  if data is None:
+    abort(404)
+  return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # TODO: insert form data as a new Venue record in the db, instead
+  
+  # TODO: modify data to be the data object returned from db insertion
+  from forms import VenueForm
+  error = False
+  form = VenueForm(request.form)
+  if request.method == "POST" and form.validate():
+    try:
+      venue = Venue(
+        name = form.name.data,
+        city = form.city.data,
+        state = form.state.data,
+        address = form.address.data,
+        phone = re.sub('\D', '', form.phone.data),
+        image_link = form.image_link.data,
+        genres = form.genres.data,
+        facebook_link = form.facebook_link.data,
+        website_link = form.website_link.data,
+        seeking_talent = form.seeking_talent.data,
+        seeking_description = form.seeking_description.data
+      )
+      db.session.add(venue)
+      db.session.commit()
+    except Exception:
+      error = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if not error:
+      # on successful db insert, flash success
+      cache.evict('venues')
+      flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    else:
+      flash('An error occurred. Show could not be listed.')
+  else:
+    flash(form.errors)
+
+  # on successful db insert, flash success
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
+
+@blueprint.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  venue = Venue.query.get(venue_id)
+  eror = False
+  body = {}
+  if venue:
+    name = venue.name
+    cache_names = venue_cache_names(venue.id)
+    artist_ids = [a for a, in db.session.query(Show.artist_id).filter(Show.venue_id == venue.id).distinct()]
+    try:
+      db.session.delete(venue)
+      # the venue's shows are gone with it, recount the artists who played there
+      recount_artists.delay(artist_ids)
+      refresh_feed.delay(venue_ids=[venue.id])
+      db.session.commit()
+      body['delete'] = True
+      body['url'] = url_for('index')
+    except:
+      eror = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if not eror:
+      evict_pages(*cache_names)
+      flash('Venue ' + name + ' was successfully deleted!')
+      return jsonify(body)
+    flash('An error occurred deleting venue '+name+'.')
+  else:
+    flash('An error occurred. Venue could not be deleted.')
+    return redirect(url_for('venues.venues'))
+
+  # return None
+
+#  Update
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    venue = Venue.query.get(venue_id)
+    if not venue:
+        return redirect(url_for('index'))
+    form = VenueForm(obj=venue)
+    venue = {"id": venue_id, "name": venue.name, "genres": venue.genres, "address": venue.address, "city": venue.city, "state": venue.state, "phone": venue.phone, "website": venue.website_link, "facebook_link": venue.facebook_link, "seeking_talent": venue.seeking_talent, "seeking_description": venue.seeking_description, "image_link": venue.image_link}
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  from forms import VenueForm
+  error = False
+  form = VenueForm(request.form)
+  if request.method == "POST" and form.validate():
+    try:
+      edit_venue = Venue.query.get(venue_id)
+      edit_venue.name = form.name.data
+      edit_venue.city = form.city.data
+      edit_venue.state = form.state.data
+      edit_venue.address = form.address.data
+      edit_venue.phone = form.phone.data
+      edit_venue.genres = form.genres.data
+      edit_venue.seeking_talent = form.seeking_talent.data
+      edit_venue.seeking_description = form.seeking_description.data
+      edit_venue.image_link = form.image_link.data
+      edit_venue.website_link = form.website_link.data
+      edit_venue.facebook_link = form.facebook_link.data
+      refresh_feed.delay(venue_ids=[venue_id])
+      db.session.commit()
+    except Exception:
+      error = True
+      db.session.rollback()
+    finally:
+      db.session.close()
+    if not error:
+      # on successful db insert, flash success
+      evict_pages(*venue_cache_names(venue_id))
+      flash('Venue ' + request.form['name'] + ' was successfully edited!')
+    else:
+      flash('An error occurred. Venue ' + form.name.data + ' could not be edited.')
+  else:
+    flash(form.errors)
+  
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))